@@ -1,11 +1,25 @@
 from os import path
-import json
+import argparse
+from typing import Callable
 
 from functions.lander import *
 from functions.colors import *
 from functions.data_structures import *
 from functions.utilities import *
 from functions.game_audio import GameAudio
+from functions.clock import GameClock
+from functions.text import TextRenderer
+from functions.screens import ScreenCache
+from functions.dirty_rects import DirtyRectRenderer
+from functions.masks import MaskCache, build_profiles
+from functions.assets import AssetManager
+from functions.score_store import ScoreStore
+from functions.score_writer import ScoreWriter
+from functions.leaderboard import Leaderboard
+from functions.replay import ReplayRecorder, entry_from_state
+from functions.autopilot import Autopilot
+from functions.profiler import FrameProfiler, ProfilerOverlay
+from functions.input import InputHandler
 
 import pygame
 
@@ -15,10 +29,14 @@ class LunarLanderGame:
             self,
             dimensions: tuple[int, int] = (720, 720),
             fps: int = 60,
-            game_state: str = 'main_menu') -> None:
+            game_state: str = 'main_menu',
+            clock: GameClock | None = None,
+            dirty_rects: bool = False,
+            autopilot: Autopilot | None = None,
+            profiler: FrameProfiler | None = None) -> None:
 
         # https://semver.org/
-        self.version = '1.1.1'
+        self.version = '1.3.0'
 
         self.abs_path = path.dirname(path.abspath(__file__))
         self.audio_path = path.join(self.abs_path, 'assets', 'audio')
@@ -26,31 +44,86 @@ class LunarLanderGame:
         pygame.init()
         pygame.display.set_caption(f'Lunar Lander | {self.version}')
         pygame.font.init()
-        pygame.display.set_icon(pygame.image.load(
-            path.join(self.abs_path, 'assets', 'lander', 'lander_default.png')))
+
+        # every image and font is loaded once through here
+        self.assets = AssetManager(self.abs_path)
+        pygame.display.set_icon(
+            self.assets.image('lander', 'lander_default.png', convert=False))
 
         self.game_state: str | None = game_state
-        self.start_time: datetime = datetime.now()
         self.flight_time: float = 0.0
 
+        # every timer in the game reads this clock, pass a simulated one
+        # (optionally time warped) to run flights faster than realtime
+        self.clock = clock if clock is not None else GameClock()
+
         # game_loop_init (and difficulty) goes up by 1 every successful landing
         self.game_loop_int: int = 1
 
         # user interface settings
         self.background = black
-        self.fps = fps
+        self.fps = fps  # render rate only, physics always runs at TICK_RATE
+        self.frame_clock = pygame.time.Clock()
         self.dimensions = dimensions
-        self.font = pygame.font.Font(
-            path.join(self.abs_path, 'assets', 'VT323-Regular.ttf'), 24)
+        self.font = self.assets.font('VT323-Regular.ttf', 24)
+        self.text = TextRenderer(self.font)
+        self.text.warm_glyphs([white, red])
         self.canvas = pygame.display.set_mode(self.dimensions)
+        self.screens = ScreenCache(self.dimensions)
+
+        # everything static in flight (space and terrain) is drawn once per
+        # flight here, the terrain itself is generated in init_game
+        self.terrain: Terrain | None = None
+        self.scene_background = self.render_scene_background()
+
+        # optional: only push the regions that changed to the display
+        self.dirty: DirtyRectRenderer | None = (
+            DirtyRectRenderer(self.canvas, self.scene_background)
+            if dirty_rects else None)
+
+        # lander sprites are rotated once here instead of every frame
+        self.lander_sprites = RotationCache(
+            load_lander_sprites(self.assets), angle_step=1.0)
+        self.lander_sprites.warm()
+        # and their pixel masks made once from those, physics only reads
+        # the collision profiles built from them
+        self.lander_masks = MaskCache(self.lander_sprites)
+        self.lander_masks.warm()
+        self.collision = build_profiles(self.lander_masks)
+        self.astronauts_sprite = self.assets.image('astronauts.png', width=50)
 
         # high score settings
         self.user_name = NameEntry()
         self.user_score: ScoreEntry | None = None
+        # scores live in SQLite, high_scores.json is the shareable export
         self.scores_path = path.join(self.abs_path, 'high_scores.json')
-        self.high_scores: list[ScoreEntry] = []
+        self.scores_db_path = path.join(self.abs_path, 'high_scores.db')
+        self.score_writer: ScoreWriter | None = None
+        self.leaderboard = Leaderboard(size=10)
+        # every version's best runs under today's scoring, TAB on the
+        # high score screen switches to it
+        self.rescored_leaderboard = Leaderboard(size=10, all_versions=True)
+        self.show_all_versions: bool = False
 
         self.difficulty: DifficultySettings | None = None
+        self.recorder: ReplayRecorder | None = None
+
+        # optional: flies every flight and starts the next one two seconds
+        # after touchdown, its scores are never submitted
+        self.autopilot = autopilot
+        self.autopilot_delay: float = 2.0
+        self.landed_at: float | None = None
+
+        # optional: per-stage frame timings, F3 toggles the overlay and F4
+        # saves the recorded frames as a Chrome trace
+        self.profiler = profiler
+        self.profiler_overlay: ProfilerOverlay | None = (
+            ProfilerOverlay(profiler, self.assets.font('VT323-Regular.ttf', 16))
+            if profiler is not None else None)
+        self.show_profiler: bool = profiler is not None
+
+        # keyboard state from KEYDOWN/KEYUP events, with key repeat timers
+        self.input = InputHandler()
 
         self.audio = GameAudio(self.abs_path)
 
@@ -60,41 +133,111 @@ class LunarLanderGame:
 
         self.user_score = None
         self.difficulty = DifficultySettings(self.game_loop_int)
-        self.start_time = datetime.now()
-
+        print(f'Loaded difficulty: {self.difficulty.__dict__}')
+        self.flight_time = 0.0
+        self.landed_at = None
+        self.clock.reset_accumulator()
+        if self.autopilot is not None:
+            self.autopilot.reset()
+
+        # new ground for every flight, seeded by the difficulty
+        self.terrain = difficulty_terrain(self.difficulty, self.dimensions)
+        self.scene_background = self.render_scene_background()
+        if self.dirty is not None:
+            self.dirty.set_background(self.scene_background)
+
+        sprite_size = self.lander_sprites.sprites['default'].get_size()
         self.lander: PlayerLander = PlayerLander(
-            x_pos=int(1),
-            y_pos=int(self.dimensions[1] / 4),
-            angle=90.0,
-            angular_velocity=self.difficulty.starting_angular_velocity,
-            strength=0.25,
-            max_velocity=self.difficulty.max_speed,
-            abs_path=self.abs_path,
-            heat_coefficient=self.difficulty.heat_coefficient,
-            window_dimensions=self.dimensions,
-            gravity=(self.difficulty.gravity/int(1000 / self.fps)))
-        self.lander.x_vel = self.difficulty.starting_velocity
+            launch_state(
+                self.difficulty, self.dimensions, sprite_size, self.terrain, self.collision),
+            sprites=self.lander_sprites)
+
+        # every tick's inputs are kept so the flight can be replayed
+        self.recorder = ReplayRecorder(
+            self.difficulty, self.dimensions, sprite_size,
+            terrain=self.terrain is not None, collision=self.collision is not None)
 
     def load_high_scores(self) -> None:
-        if path.exists(self.scores_path):
-            with open(self.scores_path, 'r') as f:
-                self.high_scores: list[ScoreEntry] = [
-                    ScoreEntry(**x) for x in json.load(f)]
+        # the first run imports high_scores.json into the database
+        store = ScoreStore(self.scores_db_path, legacy_json_path=self.scores_path)
+
+        # scores journaled before a crash or power cut are recovered here
+        self.score_writer = ScoreWriter(self.scores_db_path, self.scores_path)
+        self.score_writer.recover(store)
+
+        # only the current version's table is needed in memory
+        self.leaderboard.add_many(store.top(self.version, self.leaderboard.size))
+        self.rescored_leaderboard.add_many(store.rescored_top(self.rescored_leaderboard.size))
+        store.close()
+
+        # from here on only the writer thread touches the disk
+        self.score_writer.start()
 
     def write_high_scores(self) -> None:
-        high_scores = sort_scores(self.high_scores)
-        with open(self.scores_path, 'w') as f:
-            json.dump([x.as_dict() for x in high_scores], f, indent=4)
+        # flushes whatever the writer hasn't compacted yet
+        self.score_writer.close()
 
-    def calculate_flight_time(self) -> None:
-        if not self.lander.landed:  # only update flight time if the lander hasn't landed
-            self.flight_time = round(
-                (datetime.now() - self.start_time).total_seconds(), 2)
+    def submit_score(self, score: ScoreEntry) -> None:
+        self.score_writer.submit(score)
+        self.leaderboard.add(score)
+        # new scores already use the current formula
+        self.rescored_leaderboard.add(score)
 
-    def blit_menu_text(self, text_list: list[str]) -> None:
+    def calculate_flight_time(self) -> None:
+        # simulated time of the flight, physics stops stepping on landing
+        # so this is the exact tick the lander touched down on
+        self.flight_time = round(self.lander.state.time, 2)
+
+    def update_physics(self, frame_time: float) -> float:
+        for _ in range(self.clock.tick(frame_time)):
+            if self.lander.state.landed:
+                # hold still once down, the flight time stops with it
+                state = self.lander.state
+                self.lander.previous_pos = (state.x_pos, state.y_pos)
+                break
+            self.recorder.record(self.lander.inputs)
+            self.lander.update(self.clock.step_dt)
+
+        # how far we are between the last step and the next one
+        return self.clock.alpha()
+
+    def render_scene_background(self) -> pygame.Surface:
+        background = pygame.Surface(self.dimensions)
+        background.fill(self.background)
+
+        if self.terrain is None:
+            # draw the ground
+            ground_start = self.dimensions[1] - GROUND_HEIGHT
+            pygame.draw.rect(
+                background, white,
+                (0, ground_start, self.dimensions[0], GROUND_HEIGHT))
+            return background
+
+        # the heightmap as one polygon closed along the bottom of the window
+        points = list(enumerate(self.terrain.heights.tolist()))
+        points += [(self.dimensions[0] - 1, self.dimensions[1]), (0, self.dimensions[1])]
+        pygame.draw.polygon(background, white, points)
+
+        # landing pads
+        for start, end in self.terrain.pads:
+            pad_y = int(self.terrain.heights[start])
+            pygame.draw.line(background, red, (start, pad_y), (end - 1, pad_y), 3)
+
+        return background
+
+    def mark(self, rect: pygame.Rect) -> pygame.Rect:
+        # record a drawn region when running with dirty rects
+        if self.dirty is not None:
+            self.dirty.mark(rect)
+        return rect
+
+    def blit_menu_text(
+            self, text_list: list[str],
+            surface: pygame.Surface | None = None) -> None:
+        surface = self.canvas if surface is None else surface
         y_offset = None
         for line in text_list:
-            text_render = self.font.render(line, True, white)
+            text_render = self.text.render(line, white)
 
             if y_offset is None:
                 # (center of the window) - (total text blot center)
@@ -104,11 +247,22 @@ class LunarLanderGame:
             text_rect = text_render.get_rect(
                 center=(self.dimensions[0] // 2, y_offset))
             y_offset += text_render.get_height()
-            self.canvas.blit(text_render, text_rect)
+            surface.blit(text_render, text_rect)
+
+    def blit_screen(
+            self, name: str, key: tuple,
+            text_list: Callable[[], list[str]]) -> None:
+        # the text is only rebuilt and rasterized when the key changes
+        screen, bounds = self.screens.get(
+            name, key, lambda surface: self.blit_menu_text(text_list(), surface))
+        self.mark(self.canvas.blit(screen, bounds, bounds))
 
     def main_menu(self) -> None:
         self.canvas.fill(self.background)
-        menu_text = [
+        self.blit_screen('main_menu', (self.version,), self.main_menu_text)
+
+    def main_menu_text(self) -> list[str]:
+        return [
             'LUNAR LANDER',
             f'Version: {self.version}',
             '',
@@ -119,10 +273,15 @@ class LunarLanderGame:
             'Press "T" to view high scores',
             'Press "Q" to Quit']
 
-        self.blit_menu_text(menu_text)
-
     def high_score_menu(self) -> None:
-        menu_text = [
+        key = (
+            self.user_score.score,
+            tuple(self.user_name.name),
+            self.user_name.selector_index)
+        self.blit_screen('high_score', key, self.high_score_menu_text)
+
+    def high_score_menu_text(self) -> list[str]:
+        return [
             'NEW HIGH SCORE!',
             '',
             f'Score: {self.user_score.score}',
@@ -132,28 +291,38 @@ class LunarLanderGame:
             'Press "M" to return to Main Menu',
             'Press RETURN to Submit',
         ]
-        self.blit_menu_text(menu_text)
-
-    def show_high_scores(self) -> list[str]:
-        if len(self.high_scores) == 0:
-            return ['']
 
-        # only pull a slice, don't overwrite scores
-        high_scores = sort_scores(self.high_scores, self.version)[:10]
-        high_score_text = ['HIGH SCORES:', '']
+    def show_high_scores(self) -> None:
+        # the revision only changes when the table does
+        self.blit_screen(
+            'show_scores',
+            (self.leaderboard.revision, self.rescored_leaderboard.revision,
+             self.show_all_versions, self.version),
+            self.high_scores_text)
+
+    def high_scores_text(self) -> list[str]:
+        if self.show_all_versions:
+            high_scores = self.rescored_leaderboard.top(self.version)
+            high_score_text = ['HIGH SCORES, ALL VERSIONS:', '']
+        else:
+            high_scores = self.leaderboard.top(self.version)
+            high_score_text = ['HIGH SCORES:', '']
         if len(high_scores) > 0:
             for i in range(len(high_scores)):
                 score = high_scores[i]
+                version = f' ({score.game_version})' if self.show_all_versions else ''
                 high_score_text.extend([
-                    f'{i+1:>2}: {score.name}: {score.score:>8,}'
+                    f'{i+1:>2}: {score.name}{version}: {score.score:>8,}'
                 ])
 
         high_score_text.extend([
             '',
+            'Press TAB for this version only' if self.show_all_versions else
+            'Press TAB for all versions',
             'Press "M" to return to Main Menu',
         ])
 
-        self.blit_menu_text(high_score_text)
+        return high_score_text
 
     def show_settings(self) -> None:
         difficulty_text = ['Select Difficiulty']
@@ -162,7 +331,7 @@ class LunarLanderGame:
 
     def render_overheat_warning(self) -> None:
         warning_text = ''
-        if not self.lander.landed:
+        if not self.lander.state.landed:
             if self.lander.thruster_on_cooldown():
                 self.audio.play_alarm()
                 warning_text = 'MANDATORY THRUSTER COOLDOWN'
@@ -170,11 +339,11 @@ class LunarLanderGame:
                 self.audio.play_alarm()
                 warning_text = 'WARNING: HIGH HEAT!'
 
-        warning_render = self.font.render(warning_text, True, red)
+        warning_render = self.text.render(warning_text, red)
         warning_rect = warning_render.get_rect(
             center=(self.dimensions[0] // 2, self.dimensions[1] // 2))
 
-        self.canvas.blit(warning_render, warning_rect)
+        self.mark(self.canvas.blit(warning_render, warning_rect))
 
     def render_hud(self, x_pos: int, y_pos: int, spacing: int = 20) -> None:
         self.render_overheat_warning()
@@ -182,43 +351,44 @@ class LunarLanderGame:
         if self.user_score is not None:
             self.display_score(self.user_score)
 
-        combined_velocity = abs(self.lander.x_vel) + abs(self.lander.y_vel)
-        velocity_color = red if combined_velocity > self.lander.max_velocity else white  # noqa
+        state = self.lander.state
+        combined_velocity = abs(state.x_vel) + abs(state.y_vel)
+        velocity_color = red if combined_velocity > state.max_velocity else white  # noqa
 
         # X VELOCITY
-        x_vel_text = f'X velocity: {round(self.lander.x_vel, 2)}'
-        x_vel_render = self.font.render(x_vel_text, True, velocity_color)
-        self.canvas.blit(x_vel_render, (x_pos, y_pos))
+        self.mark(self.text.blit_readout(
+            self.canvas, 'X velocity: ', str(round(state.x_vel, 2)),
+            (x_pos, y_pos), velocity_color))
 
         y_pos += spacing
 
         # Y VELOCITY
-        y_vel_text = f'Y velocity: {round(self.lander.y_vel, 2)}'
-        y_vel_render = self.font.render(y_vel_text, True, velocity_color)
-        self.canvas.blit(y_vel_render, (x_pos, y_pos))
+        self.mark(self.text.blit_readout(
+            self.canvas, 'Y velocity: ', str(round(state.y_vel, 2)),
+            (x_pos, y_pos), velocity_color))
 
         y_pos += spacing
 
         # ANGLE VELOCITY
-        ang_vel_text = f'Rotation Velocity: {self.lander.rotation_velocity}'
-        ang_vel_render = self.font.render(ang_vel_text, True, white)
-        self.canvas.blit(ang_vel_render, (x_pos, y_pos))
+        self.mark(self.text.blit_readout(
+            self.canvas, 'Rotation Velocity: ', str(state.rotation_velocity),
+            (x_pos, y_pos), white))
 
         y_pos += spacing
 
         # ANGLE OF SPACECRAFT
-        current_angle = round((self.lander.angle + 90) % 360, 2)
-        angle_text = f'Current Angle: {current_angle}'
+        current_angle = round((state.angle + 90) % 360, 2)
         angle_color = white if current_angle <= 10 or current_angle >= 350 else red
-        angle_render = self.font.render(angle_text, True, angle_color)
-        self.canvas.blit(angle_render, (x_pos, y_pos))
+        self.mark(self.text.blit_readout(
+            self.canvas, 'Current Angle: ', str(current_angle),
+            (x_pos, y_pos), angle_color))
 
         y_pos += spacing
 
         # FLIGHT TIME
-        flight_time_text = f'Flight Time: {round(self.flight_time, 2)}'
-        flight_time_render = self.font.render(flight_time_text, True, white)
-        self.canvas.blit(flight_time_render, (x_pos, y_pos))
+        self.mark(self.text.blit_readout(
+            self.canvas, 'Flight Time: ', str(round(self.flight_time, 2)),
+            (x_pos, y_pos), white))
 
         y_pos += spacing
 
@@ -226,16 +396,16 @@ class LunarLanderGame:
         fuel_bar_length = 100
         fuel_bar_height = 15
 
-        fuel_render = self.font.render('Fuel:', True, white)
-        self.canvas.blit(fuel_render, (x_pos, y_pos))
+        fuel_render = self.text.render('Fuel:', white)
+        self.mark(self.canvas.blit(fuel_render, (x_pos, y_pos)))
 
-        fill = int((self.lander.fuel_remaining / self.lander.max_fuel) * fuel_bar_length)  # noqa
+        fill = int((state.fuel_remaining / state.max_fuel) * fuel_bar_length)  # noqa
         outline_rect = pygame.Rect(
             x_pos + 50, y_pos + 6, fuel_bar_length, fuel_bar_height)
         fill_rect = pygame.Rect(
             x_pos + 50, y_pos + 6, fill, fuel_bar_height)
         pygame.draw.rect(self.canvas, white, fill_rect)
-        pygame.draw.rect(self.canvas, white, outline_rect, 2)
+        self.mark(pygame.draw.rect(self.canvas, white, outline_rect, 2))
 
         y_pos += spacing
 
@@ -243,65 +413,57 @@ class LunarLanderGame:
         heat_bar_length = 100
         heat_bar_height = 15
 
-        heat_color = red if self.lander.heat > 80.0 else white
-        heat_render = self.font.render('Heat:', True, heat_color)
-        self.canvas.blit(heat_render, (x_pos, y_pos))
+        heat_color = red if state.heat > 80.0 else white
+        heat_render = self.text.render('Heat:', heat_color)
+        self.mark(self.canvas.blit(heat_render, (x_pos, y_pos)))
 
-        heat_fill = int((self.lander.heat / self.lander.max_heat) * heat_bar_length)  # noqa
+        heat_fill = int((state.heat / state.max_heat) * heat_bar_length)  # noqa
         outline_rect = pygame.Rect(
             x_pos + 50, y_pos + 6, heat_bar_length, heat_bar_height)
         heat_fill_rect = pygame.Rect(
             x_pos + 50, y_pos + 6, heat_fill, heat_bar_height)
         pygame.draw.rect(self.canvas, heat_color, heat_fill_rect)
-        pygame.draw.rect(self.canvas, heat_color, outline_rect, 2)
+        self.mark(pygame.draw.rect(self.canvas, heat_color, outline_rect, 2))
 
         # COOLDOWN TIMER
         if self.lander.thruster_on_cooldown():
-            timer = self.lander.cooldown_period - (
-                datetime.now() - self.lander.overheat_timestamp)
-            cooldown_timer = self.font.render(
-                f'Thruster Cooldown: {round(timer.total_seconds(), 2)}', True, red)
-            self.canvas.blit(cooldown_timer, (x_pos, y_pos + spacing))
-
-    def render_graphics(self) -> None:
-        ground_start = self.dimensions[1] - 25
+            timer = self.lander.cooldown_remaining()
+            self.mark(self.text.blit_readout(
+                self.canvas, 'Thruster Cooldown: ', str(round(timer, 2)),
+                (x_pos, y_pos + spacing), red))
 
-        # draw the ground
-        pygame.draw.rect(
-            self.canvas, white,
-            (0, ground_start, self.dimensions[0], 25))
+    def render_graphics(self, alpha: float = 1.0) -> None:
+        # the ground is part of scene_background
+        ground_start = ground_below(self.lander.state)
 
         # draw the lander
-        lander_sprite, x_pos, y_pos = self.lander.update()
-        self.canvas.blit(lander_sprite, (x_pos, y_pos))
-
-        if self.lander.landed and not self.lander.crashed:
-            astronauts_sprite = pygame.image.load(
-                path.join(self.abs_path, 'assets', 'astronauts.png'))
-
-            scale_factor = 50 / astronauts_sprite.get_width()
-            astronauts_sprite = pygame.transform.scale(
-                astronauts_sprite, (
-                    int(astronauts_sprite.get_width() * scale_factor),
-                    int(astronauts_sprite.get_height() * scale_factor)
-                )
-            )
+        lander_sprite, x_pos, y_pos = self.lander.render(alpha)
+        self.mark(self.canvas.blit(lander_sprite, (x_pos, y_pos)))
 
-            self.canvas.blit(
+        if self.lander.state.landed and not self.lander.state.crashed:
+            astronauts_sprite = self.astronauts_sprite
+            self.mark(self.canvas.blit(
                 astronauts_sprite, (
                     x_pos - 50,
                     ground_start - astronauts_sprite.get_height()
                 )
-            )
+            ))
 
     def audio_landed(self) -> None:
-        if not self.lander.crashed:
+        if not self.lander.state.crashed:
             self.audio.play_victory()
         else:
             self.audio.play_crash()
 
     def display_score(self, score: ScoreEntry) -> None:
-        if self.lander.crashed:
+        # everything the screen shows, an id can be reused by the next entry
+        key = (
+            score.timestamp, score.flight_time, score.fuel_remaining,
+            tuple(score.achievements), score.score, self.lander.state.crashed)
+        self.blit_screen('score', key, lambda: self.score_text(score))
+
+    def score_text(self, score: ScoreEntry) -> list[str]:
+        if self.lander.state.crashed:
             score_text = [
                 'YOU CRASHED!',
                 'Better luck next time.'
@@ -330,166 +492,246 @@ class LunarLanderGame:
             'Press Space to Continue',
         ])
 
-        self.blit_menu_text(score_text)
+        return score_text
 
     def handle_landing(self) -> None:
-        if self.lander.landed and self.user_score is None:
-            self.user_score: ScoreEntry = ScoreEntry(
-                name=NameEntry(),
-                game_version=self.version,
-                flight_time=self.flight_time,
-                fuel_remaining=round(self.lander.fuel_remaining, 2),
-                heat=round(self.lander.heat, 2),
-                difficulty_settings=self.difficulty,
-                crashed=self.lander.crashed)
-
-            self.user_score.calculate_score()
+        state = self.lander.state
+        if state.landed and self.user_score is None:
+            # built exactly the way the replay verifier rebuilds it
+            self.user_score: ScoreEntry = entry_from_state(
+                state, self.difficulty, NameEntry(), self.version)
+            self.user_score.timestamp = self.clock.timestamp()
+            self.user_score.replay = self.recorder.finish()
+            self.landed_at = self.clock.now()
 
             self.audio_landed()
 
-    def game_controls(self, keys: pygame.key.get_pressed):
+    def game_controls(self) -> None:
         # return to main menu
-        if keys[pygame.K_m]:
+        if self.input.pressed('main_menu'):
             self.game_state = 'main_menu'
 
+        # held keys are applied on every physics step until the next frame
+        self.lander.inputs = LanderInputs()
+
+        if self.autopilot is not None:
+            self.autopilot_controls()
+            return
+
         # include controls for both WASD and Arrow Keys
-        if keys[pygame.K_UP] or keys[pygame.K_w]:  # fire main thruster
+        if self.input.held('thrust'):  # fire main thruster
             self.lander.fire_thruster()
             # self.audio.play_thruster() # TODO - fix the thruster audio to be shorter
 
-        if keys[pygame.K_LEFT] or keys[pygame.K_a]:  # pitch left
+        if self.input.held('rcs_left'):  # pitch left
             self.lander.fire_rcs(0.25)
 
-        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:  # pitch right
+        if self.input.held('rcs_right'):  # pitch right
             self.lander.fire_rcs(-0.25)
 
         # take screenshot
-        if keys[pygame.K_p]:
+        if self.input.pressed('screenshot'):
             self.take_screenshot()
 
         # If landed successfully
-        if self.user_score is not None and keys[pygame.K_SPACE]:
-            if is_high_score(self.high_scores, self.user_score):
+        if self.user_score is not None and self.input.pressed('continue'):
+            if self.leaderboard.qualifies(self.version, self.user_score.score):
                 self.game_state = 'high_score'
             else:
                 # TODO - disabling for now till I figure out additive difficulty
                 # self.game_loop_int += 1
                 self.init_game()  # reset the score if not in high scores
 
-    def high_score_controls(self, keys: pygame.key.get_pressed):
-        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+    def autopilot_controls(self) -> None:
+        # the same thruster calls the keys above make
+        inputs = self.autopilot.inputs(self.lander.state)
+        if inputs.thrust:
+            self.lander.fire_thruster()
+        if inputs.left:
+            self.lander.fire_rcs(0.25)
+        if inputs.right:
+            self.lander.fire_rcs(-0.25)
+
+        if self.landed_at is not None and self.clock.now() - self.landed_at >= self.autopilot_delay:
+            self.init_game()
+
+    def high_score_controls(self) -> None:
+        # held arrows repeat on the input layer's timers
+        if self.input.triggered('right'):
             self.user_name.move_selector(1)
-        elif keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        elif self.input.triggered('left'):
             self.user_name.move_selector(-1)
-        elif keys[pygame.K_UP] or keys[pygame.K_w]:
+        elif self.input.triggered('up'):
             self.user_name.move_character(-1)
-        elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
+        elif self.input.triggered('down'):
             self.user_name.move_character(1)
-        elif keys[pygame.K_RETURN] or keys[pygame.K_m]:
-            if keys[pygame.K_m]:
-                self.game_state = 'main_menu'
-            else:
-                self.game_state = 'run'
-                self.init_game()
+        elif self.input.pressed('submit') or self.input.pressed('main_menu'):
             self.user_score.name = self.user_name.to_str()
-            self.high_scores.append(self.user_score)
-        pygame.time.wait(80)
+            self.submit_score(self.user_score)
+            # a new flight either way, so the submitted one can't qualify again
+            self.init_game()
+            self.game_state = 'main_menu' if self.input.pressed('main_menu') else 'run'
 
     def take_screenshot(self) -> None:
         filename = f'LunarLander_{datetime.now().strftime("%Y%m%d%H%M%S")}.png'
         pygame.image.save(self.canvas, path.join(self.abs_path, filename))
 
-    def handle_keyboard_events(self) -> None:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.game_state = None
+    def save_trace(self) -> None:
+        filename = f'LunarLander_trace_{datetime.now().strftime("%Y%m%d%H%M%S")}.json'
+        self.profiler.export_trace(path.join(self.abs_path, filename))
+
+    def lap(self, stage: str) -> None:
+        # closes a profiler stage, does nothing when not profiling
+        if self.profiler is not None:
+            self.profiler.lap(stage)
+
+    def render_profiler(self) -> None:
+        self.mark(self.profiler_overlay.draw(
+            self.canvas, (self.dimensions[0] - self.profiler_overlay.size[0] - 10, 10)))
 
-        keys = pygame.key.get_pressed()
+    def handle_keyboard_events(self, frame_time: float) -> None:
+        self.input.update(pygame.event.get(), frame_time)
+        if self.input.quit_requested:
+            self.game_state = None
+
+        # profiler
+        if self.profiler is not None:
+            if self.input.pressed('toggle_profiler'):
+                self.show_profiler = not self.show_profiler
+            if self.input.pressed('save_trace'):
+                self.save_trace()
 
-        # restart
-        if keys[pygame.K_r]:
+        # restart, except while naming a high score: init_game drops the
+        # score the screen shows
+        if self.input.pressed('restart') and self.game_state != 'high_score':
             self.init_game()
         # quit
-        if keys[pygame.K_q]:
+        if self.input.pressed('quit'):
             self.game_state = None
 
-        if self.game_state == 'main_menu' and any(keys):
-            if keys[pygame.K_m]:
+        if self.game_state == 'main_menu' and (self.input.any_key or self.autopilot is not None):
+            if self.input.pressed('main_menu'):
                 pass
-            elif keys[pygame.K_t]:
+            elif self.input.pressed('show_scores'):
                 self.game_state = 'show_scores'
-            elif keys[pygame.K_s]:
+            elif self.input.pressed('settings'):
                 self.game_state = 'settings'
             else:
                 self.game_state = 'run'
 
-        elif self.game_state == 'high_score' and self.user_score is not None:
-            if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-                self.user_name.move_selector(1)
-            elif keys[pygame.K_LEFT] or keys[pygame.K_a]:
-                self.user_name.move_selector(-1)
-            elif keys[pygame.K_UP] or keys[pygame.K_w]:
-                self.user_name.move_character(-1)
-            elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
-                self.user_name.move_character(1)
-            elif keys[pygame.K_RETURN]:
-                self.game_state = 'run'
-                self.user_score.name = self.user_name.to_str()
-                self.high_scores.append(self.user_score)
-                self.init_game()
-            pygame.time.wait(85)
-
         elif self.game_state == 'show_scores':
-            if keys[pygame.K_m]:
+            if self.input.pressed('all_versions'):
+                self.show_all_versions = not self.show_all_versions
+            if self.input.pressed('main_menu'):
                 self.game_state = 'main_menu'
 
         elif self.game_state == 'run':
-            self.game_controls(keys)
+            self.game_controls()
 
         elif self.game_state == 'high_score' and self.user_score is not None:
-            self.high_score_controls(keys)
+            self.high_score_controls()
 
-    def run(self) -> None:
-        self.load_high_scores()
+    def frame(self) -> None:
+        # one iteration of the game loop, lap() marks the end of each stage
+        if self.profiler is not None:
+            self.profiler.begin_frame()
 
-        # only init when loading game from start (for testing)
-        if self.game_state == 'main_menu':
-            self.init_game()
+        frame_time = self.frame_clock.tick(self.fps) / 1000
+        self.lap('tick')
 
-        while self.game_state is not None:
+        # dirty rects are only used in flight, menus redraw in full
+        use_dirty_rects = self.dirty is not None and self.game_state == 'run'
 
+        if self.game_state != 'run':
             self.canvas.fill(self.background)
+        elif use_dirty_rects:
+            self.dirty.begin_frame()
+        else:
+            self.canvas.blit(self.scene_background, (0, 0))
+        self.lap('clear')
 
-            if self.game_state == "main_menu":
-                self.main_menu()
+        if self.game_state == "main_menu":
+            self.main_menu()
+            self.lap('menu')
 
-            elif self.game_state == "high_score":
-                self.high_score_menu()
+        elif self.game_state == "high_score":
+            self.high_score_menu()
+            self.lap('menu')
 
-            elif self.game_state == 'show_scores':
-                self.show_high_scores()
+        elif self.game_state == 'show_scores':
+            self.show_high_scores()
+            self.lap('menu')
 
-            elif self.game_state == 'settings':
-                self.show_settings()
+        elif self.game_state == 'settings':
+            self.show_settings()
+            self.lap('menu')
 
-            else:
-                self.handle_landing()
-                self.calculate_flight_time()
-                self.render_graphics()
-                self.render_hud(x_pos=10, y_pos=10)
+        else:
+            alpha = self.update_physics(frame_time)
+            self.lap('physics')
+            self.calculate_flight_time()
+            self.lap('flight_time')
+            self.handle_landing()
+            self.lap('landing')
+            self.render_graphics(alpha)
+            self.lap('graphics')
+            self.render_hud(x_pos=10, y_pos=10)
+            self.lap('hud')
+
+        self.handle_keyboard_events(frame_time)
+        self.lap('events')
+
+        if self.show_profiler:
+            self.render_profiler()
+            self.lap('overlay')
+
+        if use_dirty_rects:
+            self.dirty.present()
+        else:
+            pygame.display.flip()
+            if self.dirty is not None:
+                self.dirty.invalidate()
+        self.lap('present')
 
-            self.handle_keyboard_events()
+        if self.profiler is not None:
+            self.profiler.end_frame()
 
-            pygame.display.flip()
+    def run(self) -> None:
+        self.load_high_scores()
 
-            pygame.time.Clock().tick(self.fps)
+        # only init when loading game from start (for testing)
+        if self.game_state == 'main_menu':
+            self.init_game()
+
+        while self.game_state is not None:
+            self.frame()
 
         self.write_high_scores()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Lunar Lander')
+    parser.add_argument(
+        '--dirty-rects', action='store_true',
+        help='only redraw changed regions, faster on software rendered displays')
+    parser.add_argument(
+        '--autopilot', action='store_true',
+        help='let the autopilot fly, one flight after another')
+    parser.add_argument(
+        '--profile', action='store_true',
+        help='time every stage of every frame, F3 toggles the overlay, F4 saves a trace')
+    parser.add_argument(
+        '--trace', help='on quit, save the last frames as a Chrome trace JSON (implies --profile)')
+    args = parser.parse_args()
+
     lander = LunarLanderGame(
         dimensions=(720, 720),
-        fps=60)
+        fps=60,
+        dirty_rects=args.dirty_rects,
+        autopilot=Autopilot() if args.autopilot else None,
+        profiler=FrameProfiler() if args.profile or args.trace else None)
 
     lander.run()
+
+    if args.trace:
+        lander.profiler.export_trace(args.trace)
@@ -0,0 +1,288 @@
+from os import environ, path
+from contextlib import redirect_stdout
+from typing import Callable
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+
+# no window or sound card needed, must be set before pygame is imported
+environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+from functions.data_structures import *  # noqa: E402
+from functions.utilities import *  # noqa: E402
+from functions.physics import *  # noqa: E402
+from functions.clock import GameClock  # noqa: E402
+from functions.leaderboard import Leaderboard  # noqa: E402
+from functions.autopilot import Autopilot  # noqa: E402
+from functions.profiler import FrameProfiler  # noqa: E402
+from LunarLander import LunarLanderGame  # noqa: E402
+
+
+def summarize(samples: list[int]) -> dict:
+    # samples are perf_counter_ns durations, reported in milliseconds
+    milliseconds = np.array(samples, dtype=np.float64) / 1e6
+    return {
+        'runs': len(samples),
+        'p50_ms': round(float(np.percentile(milliseconds, 50)), 5),
+        'p99_ms': round(float(np.percentile(milliseconds, 99)), 5),
+        'mean_ms': round(float(milliseconds.mean()), 5),
+        'max_ms': round(float(milliseconds.max()), 5),
+    }
+
+
+def time_calls(
+        call: Callable[[], None], iterations: int, warmup: int = 0,
+        between: Callable[[], None] | None = None) -> list[int]:
+    # `between` runs untimed before every call, e.g. to advance the flight
+    samples = []
+    for index in range(warmup + iterations):
+        if between is not None:
+            between()
+        start = time.perf_counter_ns()
+        call()
+        elapsed = time.perf_counter_ns() - start
+        if index >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+class FlightDriver:
+    # keeps game.lander in the air: the autopilot flies it one tick per
+    # advance() and a new flight starts whenever it touches down
+    def __init__(self, game: LunarLanderGame) -> None:
+        self.game = game
+        self.autopilot = Autopilot()
+        self.restart()
+
+    def restart(self) -> None:
+        with redirect_stdout(io.StringIO()):
+            self.game.init_game()
+        self.game.game_state = 'run'
+        self.autopilot.reset()
+
+    def advance(self) -> None:
+        if self.game.lander.state.landed:
+            self.restart()
+        self.game.lander.inputs = self.autopilot.inputs(self.game.lander.state)
+        self.game.lander.update(self.game.clock.step_dt)
+        self.game.calculate_flight_time()
+
+
+def random_scores(count: int, seed: int) -> list[ScoreEntry]:
+    # a big table spread over a few versions, like a busy cabinet's history
+    rng = random.Random(seed)
+    difficulty = DifficultySettings(1, seed=seed).__dict__
+    versions = ['1.0.0', '1.0.3', '1.1.0', '1.1.1']
+    return [
+        ScoreEntry(
+            name=f'P{index % 1000:03}', game_version=rng.choice(versions),
+            flight_time=round(rng.uniform(10, 120), 2),
+            fuel_remaining=round(rng.uniform(0, 100), 2),
+            heat=round(rng.uniform(0, 100), 2), crashed=False,
+            difficulty_settings=difficulty, score=rng.randrange(0, 5000),
+            timestamp=float(index))
+        for index in range(count)]
+
+
+def bench_lander_update(game: LunarLanderGame, args: argparse.Namespace) -> list[int]:
+    driver = FlightDriver(game)
+    autopilot = driver.autopilot
+
+    def decide() -> None:
+        if game.lander.state.landed:
+            driver.restart()
+        game.lander.inputs = autopilot.inputs(game.lander.state)
+
+    return time_calls(
+        lambda: game.lander.update(game.clock.step_dt),
+        args.iterations, args.warmup, decide)
+
+
+def bench_render_hud(game: LunarLanderGame, args: argparse.Namespace) -> list[int]:
+    driver = FlightDriver(game)
+    return time_calls(
+        lambda: game.render_hud(x_pos=10, y_pos=10),
+        args.iterations, args.warmup, driver.advance)
+
+
+def bench_render_graphics(game: LunarLanderGame, args: argparse.Namespace) -> list[int]:
+    driver = FlightDriver(game)
+
+    def advance() -> None:
+        driver.advance()
+        game.canvas.blit(game.scene_background, (0, 0))
+
+    return time_calls(
+        lambda: game.render_graphics(alpha=0.5),
+        args.iterations, args.warmup, advance)
+
+
+def bench_blit_menu_text(game: LunarLanderGame, args: argparse.Namespace) -> list[int]:
+    # the high score table, the longest menu there is
+    game.leaderboard = Leaderboard(size=10)
+    game.leaderboard.add_many(random_scores(10, args.seed))
+    text_list = game.high_scores_text()
+    return time_calls(
+        lambda: game.blit_menu_text(text_list),
+        args.iterations, args.warmup, lambda: game.canvas.fill(game.background))
+
+
+def bench_sort_scores(game: LunarLanderGame, args: argparse.Namespace) -> list[int]:
+    scores = random_scores(args.scores, args.seed)
+    return time_calls(lambda: sort_scores(scores, game.version), args.score_iterations, 1)
+
+
+def bench_is_high_score(game: LunarLanderGame, args: argparse.Namespace) -> list[int]:
+    scores = random_scores(args.scores, args.seed)
+    user_score = scores[0]
+    return time_calls(lambda: is_high_score(scores, user_score), args.score_iterations, 1)
+
+
+def bench_leaderboard_qualifies(game: LunarLanderGame, args: argparse.Namespace) -> list[int]:
+    # what the game calls instead of is_high_score, for comparison
+    leaderboard = Leaderboard(size=10)
+    leaderboard.add_many(random_scores(args.scores, args.seed))
+    return time_calls(
+        lambda: leaderboard.qualifies(game.version, 2500), args.iterations, args.warmup)
+
+
+def bench_frame(game: LunarLanderGame, args: argparse.Namespace) -> list[int]:
+    # the whole loop body with the autopilot on the controls, flight after
+    # flight, menus included whenever the game drops back to one
+    game.autopilot = Autopilot()
+    game.game_state = 'main_menu'
+    with redirect_stdout(io.StringIO()):
+        game.init_game()
+        samples = time_calls(game.frame, args.frames, args.warmup)
+    return samples
+
+
+BENCHMARKS: dict[str, Callable[[LunarLanderGame, argparse.Namespace], list[int]]] = {
+    'lander_update': bench_lander_update,
+    'render_hud': bench_render_hud,
+    'render_graphics': bench_render_graphics,
+    'blit_menu_text': bench_blit_menu_text,
+    'sort_scores': bench_sort_scores,
+    'is_high_score': bench_is_high_score,
+    'leaderboard_qualifies': bench_leaderboard_qualifies,
+    'frame': bench_frame,
+}
+
+
+def new_game(args: argparse.Namespace, scores_dir: str) -> LunarLanderGame:
+    # a simulated clock and no frame cap, so frames run back to back.
+    # scores go to a scratch directory instead of the real database.
+    with redirect_stdout(io.StringIO()):
+        game = LunarLanderGame(
+            dimensions=(720, 720), fps=0,
+            clock=GameClock('simulated'),
+            dirty_rects=args.dirty_rects,
+            profiler=FrameProfiler(capacity=args.frames) if args.profile else None)
+    # timings only, the overlay would be timed along with the frame
+    game.show_profiler = False
+    game.scores_path = path.join(scores_dir, 'high_scores.json')
+    game.scores_db_path = path.join(scores_dir, 'high_scores.db')
+    game.load_high_scores()
+    return game
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    # a benchmark regresses when its p50 or p99 is over the baseline's by
+    # more than `tolerance` (0.25 = 25% slower)
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for stat in ('p50_ms', 'p99_ms'):
+            limit = previous[stat] * (1 + tolerance)
+            if result[stat] > limit:
+                regressions.append(
+                    f'{name} {stat}: {result[stat]:.4f}ms, baseline {previous[stat]:.4f}ms '
+                    f'(+{result[stat] / previous[stat] - 1:.0%})')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Time the per-frame hot paths headlessly (SDL dummy drivers)')
+    parser.add_argument(
+        'benchmarks', nargs='*',
+        help=f'benchmarks to run, all of them by default: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--iterations', type=int, default=5000, help='timed calls per benchmark')
+    parser.add_argument('--warmup', type=int, default=200, help='untimed calls before timing')
+    parser.add_argument('--frames', type=int, default=10000, help='game loop iterations to time')
+    parser.add_argument('--scores', type=int, default=100000, help='entries in the large score list')
+    parser.add_argument('--score-iterations', type=int, default=20)
+    parser.add_argument('--dirty-rects', action='store_true', help='run the game with dirty rects')
+    parser.add_argument(
+        '--profile', action='store_true',
+        help='break the frame benchmark down by stage with the frame profiler')
+    parser.add_argument('--trace', help='save the profiled frames as a Chrome trace JSON')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare against, exits 1 on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    names = args.benchmarks if len(args.benchmarks) > 0 else list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            raise SystemExit(f'ERROR: unknown benchmark: {name}')
+
+    # the flights' difficulty seeds come from here
+    random.seed(args.seed)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as scores_dir:
+        game = new_game(args, scores_dir)
+        print(f'{"benchmark":<22} {"runs":>6} {"p50 ms":>9} {"p99 ms":>9} {"mean ms":>9} {"max ms":>9}')
+        for name in names:
+            results[name] = summarize(BENCHMARKS[name](game, args))
+            result = results[name]
+            print(
+                f'{name:<22} {result["runs"]:>6} {result["p50_ms"]:>9.4f} {result["p99_ms"]:>9.4f} '
+                f'{result["mean_ms"]:>9.4f} {result["max_ms"]:>9.4f}')
+        game.write_high_scores()
+    pygame.quit()
+
+    # where the timed frames went, stage by stage
+    stages = {}
+    if game.profiler is not None and game.profiler.frames > 0:
+        stages = game.profiler.summary()
+        print(f'{"frame stage":<22} {"":>6} {"p50 ms":>9} {"p99 ms":>9} {"mean ms":>9} {"max ms":>9}')
+        for name, result in stages.items():
+            print(
+                f'{name:<22} {"":>6} {result["p50_ms"]:>9.4f} {result["p99_ms"]:>9.4f} '
+                f'{result["mean_ms"]:>9.4f} {result["max_ms"]:>9.4f}')
+        if args.trace is not None:
+            game.profiler.export_trace(args.trace)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'game_version': game.version,
+                'python': platform.python_version(),
+                'pygame': pygame.version.ver,
+                'platform': platform.platform(),
+                'dirty_rects': args.dirty_rects,
+                'benchmarks': results,
+                'frame_stages': stages,
+            }, f, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['benchmarks']
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        sys.exit(1 if len(regressions) > 0 else 0)
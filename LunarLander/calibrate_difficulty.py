@@ -0,0 +1,77 @@
+from os import cpu_count
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import argparse
+import csv
+import json
+import time
+
+from functions.calibration import CalibrationCell, run_cell
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Fly a reference controller over a grid of difficulty settings')
+    parser.add_argument(
+        '--preset', type=int, default=2,
+        help='difficulty preset the random starts come from (2 = Curveball)')
+    parser.add_argument('--gravity', type=float, nargs='+', default=[0.02, 0.0253, 0.03, 0.035])
+    parser.add_argument('--heat', type=float, nargs='+', default=[0.5, 1.0, 1.5])
+    parser.add_argument('--max-speed', type=float, nargs='+', default=[1.0, 1.5, 2.0])
+    parser.add_argument('--multiplier', type=float, nargs='+', default=[1.0])
+    parser.add_argument('--runs', type=int, default=2000, help='random starts per cell')
+    parser.add_argument('--max-seconds', type=float, default=120.0)
+    parser.add_argument('--flat', action='store_true', help='fly over the old flat ground instead of terrain')
+    parser.add_argument(
+        '--bounding-box', action='store_true',
+        help='touch down with the rotated bounding box instead of the sprite pixels')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=cpu_count())
+    parser.add_argument('--output', help='write every cell to this .json or .csv file')
+    args = parser.parse_args()
+
+    cells = [
+        CalibrationCell(
+            difficulty_preset=args.preset, gravity=gravity,
+            heat_coefficient=heat, max_speed=max_speed,
+            score_multiplier=multiplier, runs=args.runs, seed=args.seed + index)
+        for index, (gravity, heat, max_speed, multiplier) in enumerate(product(
+            args.gravity, args.heat, args.max_speed, args.multiplier))]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(
+            run_cell, cells,
+            [(720, 720)] * len(cells), [(50, 50)] * len(cells),
+            [args.max_seconds] * len(cells), [not args.flat] * len(cells),
+            [not args.bounding_box] * len(cells)))
+    elapsed = time.perf_counter() - start
+
+    print(f'{"gravity":>8} {"heat":>5} {"speed":>5} {"mult":>5} {"landed":>7} {"crashed":>7} {"on pad":>7} {"p10":>7} {"p50":>7} {"p90":>7}')
+    for result in results:
+        percentiles = [
+            f'{x:>7.0f}' if x is not None else f'{"-":>7}'
+            for x in result['score_percentiles'].values()]
+        print(
+            f'{result["gravity"]:>8} {result["heat_coefficient"]:>5} '
+            f'{result["max_speed"]:>5} {result["score_multiplier"]:>5} '
+            f'{result["success_rate"]:>7.1%} {result["crash_rate"]:>7.1%} '
+            f'{result["pad_rate"]:>7.1%} {" ".join(percentiles)}')
+
+    flights = len(cells) * args.runs
+    print(f'{len(cells)} cells, {flights:,} flights in {elapsed:.2f}s ({flights / elapsed:,.0f} flights/s)')
+
+    if args.output is not None:
+        if args.output.endswith('.csv'):
+            with open(args.output, 'w', newline='') as f:
+                writer = csv.writer(f)
+                columns = [x for x in results[0] if x != 'score_percentiles']
+                percentiles = list(results[0]['score_percentiles'])
+                writer.writerow(columns + percentiles)
+                for result in results:
+                    writer.writerow(
+                        [result[x] for x in columns] +
+                        [result['score_percentiles'][x] for x in percentiles])
+        else:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=4)
@@ -0,0 +1,81 @@
+import pygame
+import time
+from os import path
+
+
+class AssetManager:
+    # loads, scales and converts every image and font once, then hands out
+    # the same surface to everyone who asks for it
+    def __init__(self, abs_path: str) -> None:
+        self.assets_path = path.join(abs_path, 'assets')
+
+        self.images: dict[tuple, pygame.Surface] = {}
+        self.fonts: dict[tuple[str, int], pygame.font.Font] = {}
+
+        self.loads: int = 0
+        self.hits: int = 0
+        self.load_seconds: float = 0.0
+
+    def asset_path(self, *parts: str) -> str:
+        return path.join(self.assets_path, *parts)
+
+    def image(
+            self, *parts: str,
+            height: int | None = None,
+            width: int | None = None,
+            rotate: float = 0.0,
+            convert: bool = True) -> pygame.Surface:
+        # height or width scales the image keeping its aspect ratio
+        key = (parts, height, width, rotate, convert)
+        surface = self.images.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+
+        start = time.perf_counter()
+        surface = pygame.image.load(self.asset_path(*parts))
+
+        if height is not None or width is not None:
+            image_width, image_height = surface.get_size()
+            scale_factor = (
+                height / image_height if height is not None else width / image_width)
+            surface = pygame.transform.scale(
+                surface, (int(image_width * scale_factor), int(image_height * scale_factor)))
+
+        if rotate:
+            surface = pygame.transform.rotate(surface, rotate)
+
+        # converting needs a display, headless callers just get the raw pixels
+        if convert and pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+
+        self.images[key] = surface
+        self.loads += 1
+        self.load_seconds += time.perf_counter() - start
+        return surface
+
+    def font(self, name: str, size: int) -> pygame.font.Font:
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is not None:
+            self.hits += 1
+            return font
+
+        start = time.perf_counter()
+        font = pygame.font.Font(self.asset_path(name), size)
+        self.fonts[key] = font
+        self.loads += 1
+        self.load_seconds += time.perf_counter() - start
+        return font
+
+    def stats(self) -> dict:
+        return {
+            'images': len(self.images),
+            'fonts': len(self.fonts),
+            'loads': self.loads,
+            'hits': self.hits,
+            'load_seconds': round(self.load_seconds, 4),
+            'image_bytes': sum(
+                x.get_bytesize() * x.get_width() * x.get_height()
+                for x in self.images.values()),
+        }
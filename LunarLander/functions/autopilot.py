@@ -0,0 +1,192 @@
+from typing import Callable
+
+import numpy as np
+
+from functions.physics import *
+from functions.batch import *
+
+
+def wrap_angle(degrees: np.ndarray | float) -> np.ndarray | float:
+    # into -180..180
+    return (degrees + 180) % 360 - 180
+
+
+def cooldown_active_array(state: LanderState | BatchSimulator) -> np.ndarray | bool:
+    # physics.cooldown_active for floats or arrays
+    start = np.where(state.heat >= state.max_heat, state.time, state.overheat_time)
+    return state.time - start <= state.cooldown_period
+
+
+def altitude_array(state: LanderState | BatchSimulator) -> np.ndarray | float:
+    # height above the ground under the feet, measured like the flat
+    # ground always was: from the bottom of the window on flat ground
+    if isinstance(state, BatchSimulator):
+        ground = state.ground_below()
+    else:
+        ground = ground_below(state)
+    return ground + GROUND_HEIGHT - state.y_pos
+
+
+def pad_offset_array(
+        state: LanderState | BatchSimulator,
+        ahead: np.ndarray | float = 0.0) -> np.ndarray | float:
+    # signed distance to the landing pad nearest to `ahead` pixels away,
+    # 0 with nowhere to aim for. the lander wraps a sprite's width past the
+    # edges rather than at the terrain's width, so it never aims around
+    # the wrap.
+    terrain = state.terrain
+    if terrain is None:
+        return np.zeros_like(state.x_pos)
+    return nearest_offsets(terrain.pad_centers, state.x_pos + ahead) + ahead
+
+
+class Autopilot:
+    # PID on the lander's angle and descent rate. it only asks for the same
+    # thrust/left/right the keyboard does and holds off while the thrusters
+    # are cooling down or would overheat. everything is numpy, so one
+    # Autopilot flies either a LanderState or a whole BatchSimulator.
+    #
+    # over terrain it leans toward the pad it can stop over and only starts
+    # the final descent once it's above that pad, upright and barely
+    # drifting. until then it holds its height below approach_altitude.
+    def __init__(
+            self,
+            angle_gains: tuple[float, float, float] = (0.05, 0.0, 1.0),
+            descent_gains: tuple[float, float, float] = (1.0, 0.5, 0.0),
+            rcs_deadband: float = 0.3,
+            lean_gain: float = 300.0,
+            max_lean: float = 45.0,
+            lean_altitude: float = 200.0,
+            max_drift: float = 0.05,
+            max_thrust_error: float = 45.0,
+            heat_margin: float = 5.0,
+            approach_acceleration: float = 0.0008,
+            max_approach_speed: float = 0.8,
+            approach_altitude: float = 250.0,
+            pad_tolerance: float = 10.0,
+            final_lean: float = 8.0,
+            final_drift: float = 0.1,
+            upright_tolerance: float = 8.0) -> None:
+        self.angle_gains = angle_gains
+        self.descent_gains = descent_gains
+        self.rcs_deadband = rcs_deadband
+        # lean into sideways drift while high up, no more than final_lean
+        # off upright (270) below that
+        self.lean_gain = lean_gain
+        self.max_lean = max_lean
+        self.lean_altitude = lean_altitude
+        self.final_lean = final_lean
+        # sideways speed worth burning fuel on while leaning
+        self.max_drift = max_drift
+        # only thrust when pointing roughly the right way
+        self.max_thrust_error = max_thrust_error
+        # stop firing this many heat units short of a forced cooldown
+        self.heat_margin = heat_margin
+        # sideways speed that can still be braked to a stop over the pad
+        self.approach_acceleration = approach_acceleration
+        self.max_approach_speed = max_approach_speed
+        self.approach_altitude = approach_altitude
+        # how close to the pad's center, how slow sideways and how upright
+        # the final descent has to be
+        self.pad_tolerance = pad_tolerance
+        self.final_drift = final_drift
+        self.upright_tolerance = upright_tolerance
+        self.reset()
+
+    def reset(self) -> None:
+        # integrals and previous errors, scalars until the first batch
+        self.angle_integral = 0.0
+        self.descent_integral = 0.0
+        self.previous_angle_error = None
+        self.previous_descent_error = None
+        self.previous_time = None
+        # landers already on their final descent
+        self.descending = False
+
+    def target_descent(self, altitude: np.ndarray | float) -> np.ndarray | float:
+        return np.clip(altitude * 0.002, 0.15, 0.6)
+
+    def commands(self, state: LanderState | BatchSimulator) -> tuple:
+        # state is a LanderState or a BatchSimulator, the same math runs on
+        # floats and arrays. returns (thrust, left, right).
+        dt = 0.0 if self.previous_time is None else state.time - self.previous_time
+        # copied, BatchSimulator updates its time array in place
+        self.previous_time = np.copy(state.time)
+
+        altitude = altitude_array(state)
+        # aim for the pad nearest to where the lander could stop, at a
+        # speed it can still brake from
+        stopping = state.x_vel * np.abs(state.x_vel) / (2 * self.approach_acceleration)
+        offset = pad_offset_array(state, stopping)
+        approach = np.sign(offset) * np.minimum(
+            np.sqrt(2 * self.approach_acceleration * np.abs(offset)), self.max_approach_speed)
+        drift = state.x_vel - approach
+        lean_limit = np.where(altitude > self.lean_altitude, self.max_lean, self.final_lean)
+        lean = np.clip(drift * self.lean_gain, -lean_limit, lean_limit)
+
+        # angle: the derivative of the error is minus the rotation velocity
+        kp, ki, kd = self.angle_gains
+        angle_error = wrap_angle(270 + lean - state.angle)
+        self.angle_integral = self.angle_integral + angle_error * dt
+        rotation = kp * angle_error + ki * self.angle_integral - kd * state.rotation_velocity
+
+        # descent: positive error means falling faster than wanted
+        lined_up = (
+            (np.abs(offset) <= self.pad_tolerance) &
+            (np.abs(state.x_vel) <= self.final_drift) &
+            (np.abs(wrap_angle(270 - state.angle)) <= self.upright_tolerance))
+        # once started it carries on unless the lander drifts off the pad
+        self.descending = lined_up | (
+            self.descending &
+            (np.abs(offset) <= 2 * self.pad_tolerance) &
+            (np.abs(state.x_vel) <= 2 * self.final_drift))
+        target = np.where(
+            self.descending | (altitude > self.approach_altitude),
+            self.target_descent(altitude), 0.0)
+        kp, ki, kd = self.descent_gains
+        descent_error = state.y_vel - target
+        self.descent_integral = np.clip(self.descent_integral + descent_error * dt, -0.5, 0.5)
+        derivative = 0.0
+        if self.previous_descent_error is not None and np.all(dt > 0):
+            derivative = (descent_error - self.previous_descent_error) / dt
+        self.previous_descent_error = descent_error
+        braking = kp * descent_error + ki * self.descent_integral + kd * derivative
+        drifting = (
+            (altitude > self.lean_altitude) & (np.abs(drift) > self.max_drift) &
+            (state.y_vel > 0))
+
+        # respect thruster_on_cooldown and keep clear of the heat limit
+        ready = (
+            ~np.asarray(cooldown_active_array(state)) &
+            (state.heat + state.heat_coefficient + self.heat_margin < state.max_heat) &
+            (state.fuel_remaining > 0))
+
+        left = ready & (rotation > self.rcs_deadband)
+        right = ready & (rotation < -self.rcs_deadband)
+        thrust = ready & ((braking > 0) | drifting) & (np.abs(angle_error) < self.max_thrust_error)
+        return thrust, left, right
+
+    def inputs(self, state: LanderState) -> LanderInputs:
+        thrust, left, right = self.commands(state)
+        return LanderInputs(thrust=bool(thrust), left=bool(left), right=bool(right))
+
+    def batch_inputs(self, batch: BatchSimulator) -> np.ndarray:
+        thrust, left, right = self.commands(batch)
+        return (
+            thrust * INPUT_THRUST | left * INPUT_LEFT | right * INPUT_RIGHT).astype(np.uint8)
+
+
+def fly(
+        state: LanderState, autopilot: Autopilot,
+        dt: float = 1 / TICK_RATE, max_steps: int = 300 * TICK_RATE,
+        record: Callable[[LanderInputs], None] | None = None) -> LanderState:
+    # headless flight to touchdown (or max_steps), record gets every tick's
+    # inputs, e.g. ReplayRecorder.record
+    for _ in range(max_steps):
+        if state.landed:
+            break
+        inputs = autopilot.inputs(state)
+        if record is not None:
+            record(inputs)
+        step(state, inputs, dt)
+    return state
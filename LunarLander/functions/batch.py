@@ -0,0 +1,232 @@
+import numpy as np
+
+from functions.physics import *
+
+
+# input bits, one uint8 per lander per step
+INPUT_THRUST: int = 1
+INPUT_LEFT: int = 2
+INPUT_RIGHT: int = 4
+
+
+def pack_inputs(inputs: LanderInputs) -> int:
+    return (
+        INPUT_THRUST * inputs.thrust |
+        INPUT_LEFT * inputs.left |
+        INPUT_RIGHT * inputs.right)
+
+
+def unpack_inputs(bits: int) -> LanderInputs:
+    return LanderInputs(
+        thrust=bool(bits & INPUT_THRUST),
+        left=bool(bits & INPUT_LEFT),
+        right=bool(bits & INPUT_RIGHT))
+
+
+def step_times(steps: int, dt: float) -> np.ndarray:
+    # simulated time after 0..steps steps, summed one dt at a time the way
+    # physics.step does, so flight times round exactly like the game's
+    times = [0.0]
+    for _ in range(steps):
+        times.append(times[-1] + dt)
+    return np.array(times)
+
+
+class BatchSimulator:
+    # structure-of-arrays version of physics.step for N landers at once.
+    # every lander shares the window and sprite size, everything else can
+    # be set per lander so parameter sweeps fit in one batch. either every
+    # lander has its own terrain or all of them fly over flat ground, and
+    # they all collide the same way: with one CollisionProfiles or none.
+    float_fields: tuple[str, ...] = (
+        'x_pos', 'y_pos', 'angle', 'x_vel', 'y_vel', 'rotation_velocity',
+        'thruster_strength', 'rcs_strength', 'mass', 'gravity',
+        'max_velocity', 'heat_coefficient', 'fuel_remaining', 'max_fuel',
+        'heat', 'max_heat', 'time', 'overheat_time', 'cooldown_period')
+    bool_fields: tuple[str, ...] = ('thrusting', 'landed', 'crashed', 'on_pad')
+
+    def __init__(
+            self, count: int,
+            window_dimensions: tuple[int, int] = (720, 720),
+            size: tuple[int, int] = (50, 50)) -> None:
+        self.count = count
+        self.window_dimensions = window_dimensions
+        self.size = size
+
+        defaults = LanderState(
+            x_pos=0.0, y_pos=0.0, window_dimensions=window_dimensions,
+            gravity=0.0, max_velocity=0.0, heat_coefficient=0.0, size=size)
+        for name in self.float_fields:
+            setattr(self, name, np.full(count, getattr(defaults, name), dtype=np.float64))
+        for name in self.bool_fields:
+            setattr(self, name, np.zeros(count, dtype=bool))
+
+        self.terrain: TerrainBatch | None = None
+        self.collision: CollisionProfiles | None = None
+
+    @classmethod
+    def from_states(cls, states: list[LanderState]) -> 'BatchSimulator':
+        batch = cls(
+            len(states),
+            window_dimensions=states[0].window_dimensions,
+            size=states[0].size)
+        for name in cls.float_fields + cls.bool_fields:
+            getattr(batch, name)[:] = [getattr(x, name) for x in states]
+
+        terrains = [x.terrain for x in states]
+        if any(x is not None for x in terrains):
+            if any(x is None for x in terrains):
+                raise ValueError('ERROR: a batch is either all terrain or all flat ground')
+            batch.terrain = TerrainBatch(terrains)
+
+        batch.collision = states[0].collision
+        if any(x.collision is not batch.collision for x in states):
+            raise ValueError('ERROR: every lander in a batch needs the same collision profiles')
+        return batch
+
+    def state(self, index: int) -> LanderState:
+        values = {
+            name: getattr(self, name)[index].item()
+            for name in self.float_fields + self.bool_fields}
+        return LanderState(
+            window_dimensions=self.window_dimensions, size=self.size,
+            terrain=self.terrain.terrains[index] if self.terrain is not None else None,
+            collision=self.collision,
+            **values)
+
+    def set_state(self, index: int, state: LanderState) -> None:
+        # restart one lander in place, e.g. when a sub-environment resets
+        for name in self.float_fields + self.bool_fields:
+            getattr(self, name)[index] = getattr(state, name)
+
+        if state.terrain is None:
+            if self.terrain is not None:
+                raise ValueError('ERROR: a batch is either all terrain or all flat ground')
+        elif self.terrain is None:
+            # the first terrain stands in for every lander until it's reset
+            self.terrain = TerrainBatch([state.terrain] * self.count)
+        else:
+            self.terrain.set(index, state.terrain)
+
+        if self.collision is None:
+            self.collision = state.collision
+        elif state.collision is not self.collision:
+            raise ValueError('ERROR: every lander in a batch needs the same collision profiles')
+
+    def thruster_on_cooldown(self, mask: np.ndarray | None = None) -> np.ndarray:
+        # like physics.thruster_on_cooldown, the overheat time only moves
+        # for landers that are actually checked (mask)
+        overheated = self.heat >= self.max_heat
+        if mask is not None:
+            overheated &= mask
+        self.overheat_time[overheated] = self.time[overheated]
+        return self.time - self.overheat_time <= self.cooldown_period
+
+    def heat_warning(self) -> np.ndarray:
+        return self.heat >= (self.max_heat * 0.8)
+
+    def thruster_conditions(self, requested: np.ndarray) -> np.ndarray:
+        # short-circuits the same way as physics.thruster_conditions
+        ready = requested & (self.fuel_remaining > 0) & ~self.landed
+        return ready & ~self.thruster_on_cooldown(ready)
+
+    def feet(self) -> tuple[np.ndarray, np.ndarray]:
+        half_width = self.size[0] / 2
+        return self.x_pos - half_width, self.x_pos + half_width
+
+    def ground_below(self) -> np.ndarray:
+        # physics.ground_below for every lander
+        if self.terrain is None:
+            return np.full(self.count, float(self.window_dimensions[1] - GROUND_HEIGHT))
+        return self.terrain.highest(*self.feet()).astype(np.float64)
+
+    def touching_ground(self, sprite_width: np.ndarray, sprite_height: np.ndarray) -> np.ndarray:
+        if self.terrain is None:
+            return self.y_pos >= self.window_dimensions[1] - sprite_height
+        if self.collision is not None:
+            return self.collision.touching_batch(
+                self.terrain, self.x_pos, self.y_pos, self.angle, self.thrusting, ~self.landed)
+        half_width = sprite_width / 2
+        return self.y_pos + sprite_height / 2 >= self.terrain.highest(
+            self.x_pos - half_width, self.x_pos + half_width)
+
+    def rotated_size(self) -> tuple[np.ndarray, np.ndarray]:
+        width, height = self.size
+        radians = np.radians(self.angle)
+        cos_a, sin_a = np.cos(radians), np.sin(radians)
+        cx, cy = cos_a * width, cos_a * height
+        sx, sy = sin_a * width, sin_a * height
+        new_width = np.maximum(
+            np.maximum(np.abs(cx + sy), np.abs(cx - sy)),
+            np.maximum(np.abs(-cx + sy), np.abs(-cx - sy)))
+        new_height = np.maximum(
+            np.maximum(np.abs(sx + cy), np.abs(sx - cy)),
+            np.maximum(np.abs(-sx + cy), np.abs(-sx - cy)))
+        return np.trunc(new_width), np.trunc(new_height)
+
+    def step(self, inputs: np.ndarray, dt: float) -> None:
+        # inputs is a uint8 array of INPUT_* bits, one entry per lander
+        scale = dt * TICK_RATE
+        self.time += dt
+        self.thrusting[:] = False
+
+        # same order as physics.step: thrust, then left, then right, each
+        # re-checking fuel and cooldown after the previous one
+        fire = self.thruster_conditions((inputs & INPUT_THRUST) != 0)
+        angle_radians = np.radians(self.angle[fire])
+        strength = self.thruster_strength[fire]
+        self.thrusting |= fire
+        self.fuel_remaining[fire] -= strength * scale
+        self.x_vel[fire] -= strength * np.cos(angle_radians) / self.mass[fire] * scale
+        self.y_vel[fire] += strength * np.sin(angle_radians) / self.mass[fire] * scale
+        self.heat[fire] += self.heat_coefficient[fire] * scale
+
+        for bit, direction in ((INPUT_LEFT, 1.0), (INPUT_RIGHT, -1.0)):
+            fire = self.thruster_conditions((inputs & bit) != 0)
+            self.fuel_remaining[fire] -= self.thruster_strength[fire] * scale
+            self.rotation_velocity[fire] += direction * self.rcs_strength[fire] * scale
+            self.heat[fire] += self.heat_coefficient[fire] * scale
+
+        self.angle = (self.angle + self.rotation_velocity * scale) % 360
+        sprite_width, sprite_height = self.rotated_size()
+
+        touching = ~self.landed & self.touching_ground(sprite_width, sprite_height)
+        flying = ~self.landed & ~touching
+
+        # attempt_landing for everything that reached the ground this step
+        valid_landing_angle = (self.angle > 260) & (self.angle < 280)
+        crashed = (self.max_velocity <= self.y_vel + self.x_vel) | ~valid_landing_angle
+        if self.terrain is not None and touching.any():
+            left, right = self.feet()
+            on_pad = self.terrain.pad_under(left, right) >= 0
+            rise = self.terrain.lowest(left, right) - self.terrain.highest(left, right)
+            crashed |= ~on_pad & (rise > MAX_LANDING_SLOPE * self.size[0])
+            self.on_pad[touching] = on_pad[touching]
+        self.landed |= touching
+        self.rotation_velocity[touching] = 0
+        self.crashed[touching] = crashed[touching]
+
+        # wrap around the X boundaries
+        x_min = 0 - sprite_width
+        x_max = self.window_dimensions[0] + sprite_width
+        wrap_left = flying & (self.x_pos < x_min)
+        wrap_right = flying & ~wrap_left & (self.x_pos > x_max)
+        self.x_pos[wrap_left] = (x_max - 1)[wrap_left]
+        self.x_pos[wrap_right] = (x_min + 1)[wrap_right]
+
+        heat_reduce = self.heat - (self.heat_coefficient / 10) * scale
+        self.heat = np.where(flying, np.maximum(heat_reduce, 0), self.heat)
+
+        self.y_vel = np.where(flying, self.y_vel + self.gravity * scale, self.y_vel)
+        self.y_pos = np.where(flying, self.y_pos + self.y_vel * scale, self.y_pos)
+        self.x_pos = np.where(flying, self.x_pos + self.x_vel * scale, self.x_pos)
+
+    def run(self, inputs: np.ndarray, dt: float, max_steps: int) -> int:
+        # steps until every lander is down, inputs can be one mask reused
+        # every step or a (steps, N) array of masks
+        inputs = np.asarray(inputs, dtype=np.uint8)
+        steps = 0
+        while steps < max_steps and not self.landed.all():
+            self.step(inputs if inputs.ndim == 1 else inputs[steps], dt)
+            steps += 1
+        return steps
@@ -0,0 +1,87 @@
+import random
+from dataclasses import dataclass, asdict
+
+import numpy as np
+
+from functions.data_structures import *
+from functions.physics import *
+from functions.batch import *
+from functions.rescoring import score_runs
+from functions.autopilot import Autopilot
+from functions.masks import load_profiles
+
+
+@dataclass
+class CalibrationCell:
+    # one point of the difficulty grid
+    difficulty_preset: int
+    gravity: float
+    heat_coefficient: float
+    max_speed: float
+    score_multiplier: float
+    runs: int
+    seed: int
+
+    def difficulty(self, seed: int) -> DifficultySettings:
+        # the preset's random starts, with this cell's tuning on top
+        difficulty = DifficultySettings(self.difficulty_preset, seed=seed)
+        difficulty.gravity = self.gravity
+        difficulty.heat_coefficient = self.heat_coefficient
+        difficulty.max_speed = self.max_speed
+        difficulty.score_multiplier = self.score_multiplier
+        return difficulty
+
+
+def run_cell(
+        cell: CalibrationCell,
+        window_dimensions: tuple[int, int] = (720, 720),
+        size: tuple[int, int] = (50, 50),
+        max_seconds: float = 120.0,
+        terrain: bool = True,
+        collision: bool = True) -> dict:
+    # fly cell.runs random starts to the ground at once with the autopilot
+    # and summarize them
+    dt = 1 / TICK_RATE
+    rng = random.Random(cell.seed)
+    difficulties = [cell.difficulty(rng.randrange(2 ** 32)) for _ in range(cell.runs)]
+    profiles = load_profiles(size) if collision else None
+    batch = BatchSimulator.from_states([
+        launch_state(
+            x, window_dimensions, size,
+            difficulty_terrain(x, window_dimensions) if terrain else None, profiles)
+        for x in difficulties])
+
+    autopilot = Autopilot()
+    max_steps = int(max_seconds * TICK_RATE)
+    landed_at = np.zeros(cell.runs, dtype=np.int64)
+    for tick in range(max_steps):
+        batch.step(autopilot.batch_inputs(batch), dt)
+        landed_at[batch.landed & (landed_at == 0)] = tick + 1
+        if batch.landed.all():
+            break
+
+    landed = batch.landed
+    flight_times = np.round(step_times(max_steps, dt), 2)[landed_at]
+    scores, _ = score_runs({
+        'flight_time': flight_times,
+        'fuel_remaining': np.round(batch.fuel_remaining, 2),
+        'heat': np.round(batch.heat, 2),
+        'crashed': batch.crashed | ~landed,
+        'score_multiplier': np.full(cell.runs, cell.score_multiplier),
+        'on_pad': batch.on_pad,
+    })
+
+    success = landed & ~batch.crashed
+    summary = asdict(cell)
+    summary.update({
+        'success_rate': round(float(success.mean()), 4),
+        'crash_rate': round(float((landed & batch.crashed).mean()), 4),
+        'timeout_rate': round(float((~landed).mean()), 4),
+        'pad_rate': round(float((success & batch.on_pad).mean()), 4),
+        'score_percentiles': {
+            f'p{x}': round(float(np.percentile(scores[success], x)), 1) if success.any() else None
+            for x in (10, 50, 90)},
+        'mean_flight_time': round(float(flight_times[success].mean()), 2) if success.any() else None,
+        'mean_fuel_remaining': round(float(batch.fuel_remaining[success].mean()), 2) if success.any() else None,
+    })
+    return summary
@@ -0,0 +1,68 @@
+import time
+
+from functions.physics import TICK_RATE
+
+
+class GameClock:
+    # single source of game time. realtime mode follows the wall clock,
+    # simulated mode advances a fixed amount per tick() so headless runs and
+    # tests don't have to wait. both are scaled by time_warp and handed out
+    # as whole fixed physics steps.
+    modes: tuple[str, ...] = ('realtime', 'simulated')
+
+    def __init__(
+            self, mode: str = 'realtime',
+            time_warp: float = 1.0,
+            step_dt: float = 1 / TICK_RATE,
+            max_frame_time: float = 0.25,
+            start_timestamp: float | None = None) -> None:
+        if mode not in self.modes:
+            raise ValueError(f'ERROR: unknown clock mode: {mode}')
+
+        self.mode = mode
+        self.time_warp = time_warp
+        self.step_dt = step_dt
+        self.max_frame_time = max_frame_time
+
+        self.steps: int = 0
+        self.accumulator: float = 0.0
+        self.last_tick: float | None = None
+
+        # wall time the clock started at, used for score timestamps
+        self.start_timestamp: float = (
+            time.time() if start_timestamp is None else start_timestamp)
+
+    def now(self) -> float:
+        # game seconds handed out so far
+        return self.steps * self.step_dt
+
+    def timestamp(self) -> float:
+        if self.mode == 'realtime':
+            return time.time()
+        return self.start_timestamp + self.now()
+
+    def alpha(self) -> float:
+        # fraction of a step left over, for interpolated drawing
+        return self.accumulator / self.step_dt
+
+    def reset_accumulator(self) -> None:
+        self.accumulator = 0.0
+
+    def tick(self, real_seconds: float | None = None) -> int:
+        # returns how many physics steps are due since the last tick
+        if self.mode == 'simulated':
+            elapsed = self.step_dt
+        elif real_seconds is not None:
+            elapsed = real_seconds
+        else:
+            current = time.perf_counter()
+            elapsed = 0.0 if self.last_tick is None else current - self.last_tick
+            self.last_tick = current
+
+        # a slow frame only delays the simulation, it never changes the step
+        self.accumulator += min(elapsed, self.max_frame_time) * self.time_warp
+        # the epsilon stops float error from dropping a whole step
+        steps = int(self.accumulator / self.step_dt + 1e-9)
+        self.accumulator -= steps * self.step_dt
+        self.steps += steps
+        return steps
@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+
+from functions.terrain import *
+
+
+# sprites the lander flies with, in index order. the crashed sprite only
+# shows up after touchdown so it never needs to collide.
+COLLISION_SPRITES: tuple[str, ...] = ('default', 'thruster')
+
+
+class CollisionProfiles:
+    # the lowest opaque pixel of every column of the lander's rotated
+    # sprites, one row per sprite and angle bucket. against a heightmap
+    # that's all a pixel mask can touch, so comparing these columns to the
+    # terrain is exactly the mask overlap test without pygame in the
+    # physics. built from the masks by masks.build_profiles.
+    def __init__(
+            self, angle_step: float,
+            widths: np.ndarray, heights: np.ndarray,
+            bottoms: np.ndarray) -> None:
+        # widths and heights are (sprites, buckets) surface sizes, bottoms
+        # is (sprites, buckets, widest): the bottom edge of each column's
+        # lowest opaque pixel counted from the top, -1 for empty columns
+        self.angle_step = angle_step
+        self.buckets = widths.shape[1]
+        self.widths = widths.astype(np.int64)
+        self.heights = heights.astype(np.int64)
+        self.bottoms = bottoms.astype(np.int64)
+        self.lowest = self.bottoms.max(axis=2)
+        self.columns = np.arange(self.bottoms.shape[2])
+
+        # the scalar step reads lists: (width, height, lowest, columns)
+        # for every sprite and bucket, columns being (column, bottom) pairs
+        # of the opaque ones only
+        self.scalar = [
+            [
+                (int(self.widths[sprite, bucket]), int(self.heights[sprite, bucket]),
+                 int(self.lowest[sprite, bucket]),
+                 [(column, bottom) for column, bottom in enumerate(
+                     self.bottoms[sprite, bucket].tolist()) if bottom >= 0])
+                for bucket in range(self.buckets)]
+            for sprite in range(len(self.bottoms))]
+
+    def bucket(self, angle: float) -> int:
+        # same rounding as RotationCache.bucket, so the mask matches the
+        # sprite that's drawn
+        return int(round((angle % 360) / self.angle_step)) % self.buckets
+
+    def touching(
+            self, terrain: Terrain,
+            x_pos: float, y_pos: float, angle: float, thrusting: bool) -> bool:
+        width, height, lowest, columns = self.scalar[int(thrusting)][self.bucket(angle)]
+        left = x_pos - width // 2 + 0.5
+        top = y_pos - height // 2
+
+        # nothing can touch if the lowest pixel is above all the ground
+        # under the sprite
+        if top + lowest < terrain.highest(left, left + width - 1):
+            return False
+
+        heights = terrain.scalar_tables()[0]
+        for column, bottom in columns:
+            if top + bottom >= heights[math.floor(left + column) % terrain.width]:
+                return True
+        return False
+
+    def touching_batch(
+            self, terrain: TerrainBatch,
+            x_pos: np.ndarray, y_pos: np.ndarray, angle: np.ndarray,
+            thrusting: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        # touching() for every lander in `mask`, False for the rest
+        sprite = thrusting.astype(np.int64)
+        bucket = np.round((angle % 360) / self.angle_step).astype(np.int64) % self.buckets
+        width = self.widths[sprite, bucket]
+        left = x_pos - width // 2 + 0.5
+        top = y_pos - self.heights[sprite, bucket] // 2
+
+        touching = mask & (
+            top + self.lowest[sprite, bucket] >= terrain.highest(left, left + width - 1))
+        near = np.flatnonzero(touching)
+        if len(near) == 0:
+            return touching
+
+        # per column, only for the landers close enough to need it
+        bottoms = self.bottoms[sprite[near], bucket[near]]
+        columns = np.floor(left[near, None] + self.columns).astype(np.int64) % terrain.width
+        ground = terrain.heights[near[:, None], columns]
+        touching[near] = ((bottoms >= 0) & (top[near, None] + bottoms >= ground)).any(axis=1)
+        return touching
@@ -1,6 +1,7 @@
+import base64
 from dataclasses import dataclass, asdict, field
 from datetime import datetime
-from random import randint
+from random import Random, randrange
 
 
 @dataclass
@@ -14,14 +15,26 @@ class DifficultySettings:
     starting_velocity: float
     starting_angular_velocity: float
     heat_coefficient: float
-
-    def __init__(cls, difficulty_setting: int = 1) -> None:
+    # tallest hill in pixels, how many landing pads and how wide they are
+    terrain_roughness: float
+    landing_pads: int
+    pad_width: int
+    # seeds every random choice below (and the terrain), so a flight can be
+    # replayed exactly
+    seed: int
+
+    def __init__(cls, difficulty_setting: int = 1, seed: int | None = None) -> None:
         # default settings
         cls.difficulty_preset = difficulty_setting
+        cls.seed = seed if seed is not None else randrange(2 ** 32)
+        rng = Random(cls.seed)
         cls.max_speed = 1.5
         cls.starting_velocity = 1.0
         cls.starting_angular_velocity = 0.0
         cls.gravity = 0.0253
+        cls.terrain_roughness = 40.0
+        cls.landing_pads = 3
+        cls.pad_width = 100
 
         if cls.difficulty_preset == 1:
             # Moon: less gravity, less heat
@@ -32,12 +45,14 @@ class DifficultySettings:
         elif cls.difficulty_preset == 2:
             # Moon: same as 1, but with a curveball for angular velocity and starting velocity
             cls.difficulty_name = "Curveball Moon"
-            cls.starting_angular_velocity = float(randint(-5, 5))
-            cls.starting_velocity = float(randint(0, 2))
+            cls.starting_angular_velocity = float(rng.randint(-5, 5))
+            cls.starting_velocity = float(rng.randint(0, 2))
             cls.heat_coefficient = 1.0
             cls.score_multiplier = 2.0
-
-        print(f'Loaded difficulty: {cls.__dict__}')
+            # rougher ground, fewer and narrower pads
+            cls.terrain_roughness = 80.0
+            cls.landing_pads = 2
+            cls.pad_width = 80
 
 
 class NameEntry:
@@ -78,8 +93,17 @@ class ScoreEntry:
     crashed: bool
     difficulty_settings: DifficultySettings
     score: int = 0
-    timestamp: float = datetime.now().timestamp()
+    # pass GameClock.timestamp(), the default is only for loose entries
+    timestamp: float = field(default_factory=lambda: datetime.now().timestamp())
     achievements: list = field(default_factory=list)
+    # ReplayRecorder output for the flight, base64 encoded in as_dict
+    replay: bytes | None = None
+    # set down on a landing pad rather than open ground
+    on_pad: bool = False
+
+    def __post_init__(cls) -> None:
+        if isinstance(cls.replay, str):
+            cls.replay = base64.b64decode(cls.replay)
 
     def calculate_score(cls) -> None:
         if cls.crashed:
@@ -119,6 +143,11 @@ class ScoreEntry:
             cls.score += 1000
             cls.achievements.append("Cool as a cucumber")
 
+        if cls.on_pad:
+            # right on target - land on one of the landing pads
+            cls.score += 500
+            cls.achievements.append("Right on target")
+
         # V1.0.3 - Adjust score to weight fuel efficiency more heavily
         cls.score += int((cls.fuel_remaining * 2 / cls.flight_time) * 100)  # noqa
         cls.score = int(
@@ -129,6 +158,8 @@ class ScoreEntry:
         for key, value in asdict(cls).items():
             if isinstance(value, DifficultySettings):
                 response[key] = value.__dict__
+            elif isinstance(value, bytes):
+                response[key] = base64.b64encode(value).decode('ascii')
             else:
                 response[key] = value
         return response
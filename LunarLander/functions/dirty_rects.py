@@ -0,0 +1,59 @@
+import pygame
+
+
+class DirtyRectRenderer:
+    # instead of clearing and flipping the whole window, restore the
+    # background under whatever was drawn last frame and push only the
+    # regions that were touched this frame and last frame to the display.
+    def __init__(self, canvas: pygame.Surface, background: pygame.Surface) -> None:
+        self.canvas = canvas
+        self.background = background
+
+        self.previous: list[pygame.Rect] = []
+        self.current: list[pygame.Rect] = []
+        self.full_redraw: bool = True
+        # this frame started with a full repaint and has to be flipped whole
+        self.repainted: bool = False
+
+        # pixels pushed to the display on the last present()
+        self.pixels_updated: int = 0
+
+    def set_background(self, background: pygame.Surface) -> None:
+        self.background = background
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        # next frame repaints and flips the whole window. called mid-frame
+        # (a restart from the event handlers) it still holds for the next
+        # begin_frame, this frame's canvas has the old background on it.
+        self.full_redraw = True
+        self.previous = []
+        self.current = []
+
+    def begin_frame(self) -> None:
+        self.repainted = self.full_redraw
+        self.full_redraw = False
+        if self.repainted:
+            self.canvas.blit(self.background, (0, 0))
+        else:
+            for rect in self.previous:
+                self.canvas.blit(self.background, rect, rect)
+
+    def mark(self, rect: pygame.Rect) -> pygame.Rect:
+        if rect.width > 0 and rect.height > 0:
+            self.current.append(rect.copy())
+        return rect
+
+    def present(self) -> None:
+        if self.repainted or self.full_redraw:
+            pygame.display.flip()
+            self.pixels_updated = self.canvas.get_width() * self.canvas.get_height()
+            self.repainted = False
+        else:
+            # old positions have to be pushed too, or the sprite smears
+            rects = self.previous + self.current
+            pygame.display.update(rects)
+            self.pixels_updated = sum(x.width * x.height for x in rects)
+
+        self.previous = self.current
+        self.current = []
@@ -0,0 +1,248 @@
+import multiprocessing
+import random
+from multiprocessing.connection import Connection
+
+import numpy as np
+
+from functions.data_structures import *
+from functions.physics import *
+from functions.batch import *
+from functions.terrain import difficulty_terrain
+from functions.masks import load_profiles
+from functions.rescoring import score_runs
+from functions.replay import entry_from_state
+
+
+# observation vector layout, one float64 each
+OBSERVATION_FIELDS: tuple[str, ...] = (
+    'x_pos', 'y_pos', 'x_vel', 'y_vel', 'angle', 'rotation_velocity',
+    'fuel_remaining', 'heat')
+
+# actions are INPUT_* bitmasks: 0 does nothing, 1 thrusts, 2 and 4 fire the
+# left and right RCS, 7 fires everything
+ACTION_COUNT: int = 8
+
+
+def observe(state: LanderState) -> np.ndarray:
+    return np.array([getattr(state, x) for x in OBSERVATION_FIELDS], dtype=np.float64)
+
+
+class LanderEnv:
+    # gym style reset()/step() around one lander. the reward is zero until
+    # touchdown, then the score ScoreEntry.calculate_score gives the flight
+    # (zero for a crash). flights longer than max_steps are truncated.
+    # terrain=False flies over the old flat ground, collision=False touches
+    # down with the sprite's bounding box instead of its pixels.
+    def __init__(
+            self, difficulty_preset: int = 1,
+            seed: int | None = None,
+            window_dimensions: tuple[int, int] = (720, 720),
+            size: tuple[int, int] = (50, 50),
+            max_steps: int = 300 * TICK_RATE,
+            terrain: bool = True,
+            collision: bool = True) -> None:
+        self.difficulty_preset = difficulty_preset
+        self.window_dimensions = window_dimensions
+        self.size = size
+        self.max_steps = max_steps
+        self.terrain = terrain
+        self.collision = load_profiles(size) if collision else None
+        self.dt = 1 / TICK_RATE
+
+        # hands out a DifficultySettings seed for every reset
+        self.rng = random.Random(seed)
+        self.difficulty: DifficultySettings | None = None
+        self.state: LanderState | None = None
+        self.steps: int = 0
+
+    def reset(self, seed: int | None = None) -> tuple[np.ndarray, dict]:
+        if seed is not None:
+            self.rng = random.Random(seed)
+        self.difficulty = DifficultySettings(
+            self.difficulty_preset, seed=self.rng.randrange(2 ** 32))
+        self.state = launch_state(
+            self.difficulty, self.window_dimensions, self.size,
+            difficulty_terrain(self.difficulty, self.window_dimensions) if self.terrain else None,
+            self.collision)
+        self.steps = 0
+        return observe(self.state), {'seed': self.difficulty.seed}
+
+    def step(self, action: int) -> tuple[np.ndarray, float, bool, bool, dict]:
+        # returns observation, reward, terminated, truncated, info
+        step(self.state, unpack_inputs(int(action)), self.dt)
+        self.steps += 1
+
+        reward = 0.0
+        info = {}
+        if self.state.landed:
+            entry = entry_from_state(self.state, self.difficulty, '', '')
+            reward = float(entry.score)
+            info = {
+                'crashed': self.state.crashed, 'on_pad': self.state.on_pad,
+                'achievements': entry.achievements}
+
+        truncated = not self.state.landed and self.steps >= self.max_steps
+        return observe(self.state), reward, self.state.landed, truncated, info
+
+
+class VectorLanderEnv:
+    # `count` LanderEnvs stepped together on a BatchSimulator. finished
+    # sub-environments are reset automatically, their last observation is
+    # kept in info['final_observation'].
+    def __init__(
+            self, count: int,
+            difficulty_preset: int = 1,
+            seed: int | None = None,
+            window_dimensions: tuple[int, int] = (720, 720),
+            size: tuple[int, int] = (50, 50),
+            max_steps: int = 300 * TICK_RATE,
+            terrain: bool = True,
+            collision: bool = True) -> None:
+        self.count = count
+        self.difficulty_preset = difficulty_preset
+        self.window_dimensions = window_dimensions
+        self.size = size
+        self.max_steps = max_steps
+        self.terrain = terrain
+        self.collision = load_profiles(size) if collision else None
+        self.dt = 1 / TICK_RATE
+
+        self.rng = random.Random(seed)
+        self.batch = BatchSimulator(count, window_dimensions, size)
+        self.steps = np.zeros(count, dtype=np.int64)
+        self.seeds = np.zeros(count, dtype=np.int64)
+        self.score_multipliers = np.ones(count, dtype=np.float64)
+
+        # rounded flight time after n steps
+        self.flight_times = np.round(step_times(max_steps, self.dt), 2)
+
+    def observations(self) -> np.ndarray:
+        return np.stack([getattr(self.batch, x) for x in OBSERVATION_FIELDS], axis=1)
+
+    def reset_index(self, index: int) -> None:
+        difficulty = DifficultySettings(
+            self.difficulty_preset, seed=self.rng.randrange(2 ** 32))
+        self.batch.set_state(index, launch_state(
+            difficulty, self.window_dimensions, self.size,
+            difficulty_terrain(difficulty, self.window_dimensions) if self.terrain else None,
+            self.collision))
+        self.steps[index] = 0
+        self.seeds[index] = difficulty.seed
+        self.score_multipliers[index] = difficulty.score_multiplier
+
+    def reset(self, seed: int | None = None) -> tuple[np.ndarray, dict]:
+        if seed is not None:
+            self.rng = random.Random(seed)
+        for index in range(self.count):
+            self.reset_index(index)
+        return self.observations(), {'seed': self.seeds.copy()}
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict]:
+        # actions is one INPUT_* bitmask per sub-environment
+        self.batch.step(np.asarray(actions, dtype=np.uint8), self.dt)
+        self.steps += 1
+
+        terminated = self.batch.landed.copy()
+        truncated = ~terminated & (self.steps >= self.max_steps)
+        rewards = np.zeros(self.count, dtype=np.float64)
+
+        if terminated.any():
+            # the same rules as calculate_score, for every landing at once
+            scores, _ = score_runs({
+                'flight_time': self.flight_times[self.steps[terminated]],
+                'fuel_remaining': np.round(self.batch.fuel_remaining[terminated], 2),
+                'heat': np.round(self.batch.heat[terminated], 2),
+                'crashed': self.batch.crashed[terminated],
+                'on_pad': self.batch.on_pad[terminated],
+                'score_multiplier': self.score_multipliers[terminated],
+            })
+            rewards[terminated] = scores
+
+        final_observations = self.observations()
+        info = {
+            'crashed': self.batch.crashed & terminated,
+            'on_pad': self.batch.on_pad & terminated,
+            'final_observation': final_observations,
+        }
+
+        done = terminated | truncated
+        for index in np.flatnonzero(done):
+            self.reset_index(index)
+
+        observations = self.observations() if done.any() else final_observations
+        return observations, rewards, terminated, truncated, info
+
+
+def env_worker(connection: Connection, env_kwargs: dict) -> None:
+    # runs a VectorLanderEnv in a child process for SubprocessVectorEnv
+    env = VectorLanderEnv(**env_kwargs)
+    while True:
+        command, payload = connection.recv()
+        if command == 'step':
+            connection.send(env.step(payload))
+        elif command == 'reset':
+            connection.send(env.reset(payload))
+        elif command == 'close':
+            connection.close()
+            return
+
+
+class SubprocessVectorEnv:
+    # VectorLanderEnvs split across worker processes, for when one core
+    # can't step enough landers. results come back concatenated in order.
+    def __init__(
+            self, workers: int, envs_per_worker: int,
+            difficulty_preset: int = 1,
+            seed: int | None = None,
+            **env_kwargs) -> None:
+        self.count = workers * envs_per_worker
+        self.envs_per_worker = envs_per_worker
+        self.connections: list[Connection] = []
+        self.processes: list[multiprocessing.Process] = []
+
+        for worker in range(workers):
+            parent, child = multiprocessing.Pipe()
+            kwargs = dict(
+                env_kwargs, count=envs_per_worker,
+                difficulty_preset=difficulty_preset,
+                seed=None if seed is None else seed + worker)
+            process = multiprocessing.Process(
+                target=env_worker, args=(child, kwargs), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def gather(self) -> list:
+        return [x.recv() for x in self.connections]
+
+    def reset(self, seed: int | None = None) -> tuple[np.ndarray, dict]:
+        for worker, connection in enumerate(self.connections):
+            connection.send(('reset', None if seed is None else seed + worker))
+        results = self.gather()
+        return (
+            np.concatenate([x[0] for x in results]),
+            {'seed': np.concatenate([x[1]['seed'] for x in results])})
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict]:
+        actions = np.asarray(actions, dtype=np.uint8)
+        for worker, connection in enumerate(self.connections):
+            start = worker * self.envs_per_worker
+            connection.send(('step', actions[start:start + self.envs_per_worker]))
+        results = self.gather()
+
+        info = {
+            key: np.concatenate([x[4][key] for x in results])
+            for key in ('crashed', 'on_pad', 'final_observation')}
+        return (
+            np.concatenate([x[0] for x in results]),
+            np.concatenate([x[1] for x in results]),
+            np.concatenate([x[2] for x in results]),
+            np.concatenate([x[3] for x in results]),
+            info)
+
+    def close(self) -> None:
+        for connection in self.connections:
+            connection.send(('close', None))
+        for process in self.processes:
+            process.join()
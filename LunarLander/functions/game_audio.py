@@ -1,8 +1,91 @@
-from pygame import mixer
+from pygame import mixer, error
 from os import path, listdir
 import random
 
 
+# higher priority sounds can take a channel from lower priority ones
+PRIORITY_LOW: int = 1
+PRIORITY_WARNING: int = 2
+PRIORITY_EVENT: int = 3
+
+
+def sound_name(filename: str) -> str:
+    return path.splitext(filename)[0].lower()
+
+
+class SoundBank:
+    # every sound effect is decoded once at startup. each file is stored by
+    # name ('alarm', 'victory/victorysmall') and every folder is also kept
+    # as a group of variants to pick from ('explosions')
+    def __init__(self, audio_path: str) -> None:
+        self.audio_path = audio_path
+        self.sounds: dict[str, mixer.Sound] = {}
+        self.groups: dict[str, list[mixer.Sound]] = {}
+
+        for entry in sorted(listdir(audio_path)):
+            entry_path = path.join(audio_path, entry)
+            if path.isdir(entry_path):
+                self.load_group(entry.lower(), entry_path)
+            elif entry.endswith('.wav'):
+                self.sounds[sound_name(entry)] = mixer.Sound(entry_path)
+
+    def load_group(self, name: str, directory: str) -> None:
+        for entry in sorted(listdir(directory)):
+            if entry.endswith('.wav'):
+                sound = mixer.Sound(path.join(directory, entry))
+                self.sounds[f'{name}/{sound_name(entry)}'] = sound
+                self.groups.setdefault(name, []).append(sound)
+
+    def get(self, name: str) -> mixer.Sound:
+        return self.sounds[name]
+
+    def pick_random(self, group: str) -> mixer.Sound:
+        return random.choice(self.groups[group])
+
+
+class ChannelPool:
+    # fixed set of mixer channels handed out by priority. sounds can be
+    # tagged so a looping warning isn't started twice.
+    def __init__(self, channels: int = 8) -> None:
+        mixer.set_num_channels(channels)
+        self.channels: list[mixer.Channel] = [mixer.Channel(x) for x in range(channels)]
+        self.priorities: list[int] = [0] * channels
+        self.tags: list[str | None] = [None] * channels
+
+    def is_playing(self, tag: str) -> bool:
+        return any(
+            self.tags[x] == tag and self.channels[x].get_busy()
+            for x in range(len(self.channels)))
+
+    def find_channel(self, priority: int) -> int | None:
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return index
+
+        # everything is busy, take the lowest priority channel if we outrank it
+        index = min(range(len(self.channels)), key=lambda x: self.priorities[x])
+        if self.priorities[index] <= priority:
+            return index
+        return None
+
+    def play(
+            self, sound: mixer.Sound, priority: int = PRIORITY_LOW,
+            tag: str | None = None) -> mixer.Channel | None:
+        index = self.find_channel(priority)
+        if index is None:
+            return None
+
+        channel = self.channels[index]
+        channel.play(sound)
+        self.priorities[index] = priority
+        self.tags[index] = tag
+        return channel
+
+    def stop(self) -> None:
+        for channel in self.channels:
+            channel.stop()
+
+
 class GameAudio:
     def __init__(self, absolute_path: str):
         self.mixer: mixer = mixer
@@ -12,45 +95,36 @@ class GameAudio:
         self.music_path: str = path.join(
             self.audio_path, 'main-theme.mp3')
 
-        self.victory_sfx = mixer.Sound(
-            path.join(self.audio_path, 'victory', 'VictorySmall.wav'))
-
-        self.alarm_sfx = mixer.Sound(
-            path.join(self.audio_path, 'alarm.wav'))
-        self.alarm_sfx.set_volume(0.5)
+        self.sounds = SoundBank(self.audio_path)
+        self.sounds.get('alarm').set_volume(0.5)
 
-        self.thruster_sfx = mixer.Sound(
-            path.join(self.audio_path, 'Wind.wav'))
+        self.channels = ChannelPool()
 
-        self.alarm_channel = self.mixer.Channel(1)
-        self.thruster_channel = self.mixer.Channel(2)
-
-        self.mixer.music.load(
-            path.join(self.audio_path, 'main-theme.mp3'))
-
-    def pick_random_audio(self, audio_directory: str) -> str:
-        audio_files = [x for x in listdir(audio_directory) if x.endswith('.wav')]  # noqa
-        return path.join(audio_directory, random.choice(audio_files))
+        # the theme is optional, a missing or undecodable file (or the dummy
+        # audio driver) just means a silent menu
+        self.music_loaded: bool = False
+        try:
+            self.mixer.music.load(self.music_path)
+            self.music_loaded = True
+        except error as e:
+            print(f'WARNING: unable to load music: {e}')
 
     def play_music(self) -> None:
-        self.mixer.music.play(-1)
+        if self.music_loaded:
+            self.mixer.music.play(-1)
 
     def play_victory(self) -> None:
         self.mixer.music.stop()
-        self.mixer.Sound.play(self.victory_sfx)
+        self.channels.play(self.sounds.get('victory/victorysmall'), PRIORITY_EVENT)
 
     def play_crash(self) -> None:
-        audio_path = self.pick_random_audio(
-            path.join(self.audio_path, 'explosions'))
-        explosion_sound = mixer.Sound(audio_path)
-
         self.mixer.music.stop()
-        self.mixer.Sound.play(explosion_sound)
+        self.channels.play(self.sounds.pick_random('explosions'), PRIORITY_EVENT)
 
     def play_thruster(self) -> None:
-        if not self.thruster_channel.get_busy():
-            self.thruster_channel.play(self.thruster_sfx)
+        if not self.channels.is_playing('thruster'):
+            self.channels.play(self.sounds.get('wind'), PRIORITY_LOW, 'thruster')
 
     def play_alarm(self) -> None:
-        if not self.alarm_channel.get_busy():
-            self.alarm_channel.play(self.alarm_sfx)
+        if not self.channels.is_playing('alarm'):
+            self.channels.play(self.sounds.get('alarm'), PRIORITY_WARNING, 'alarm')
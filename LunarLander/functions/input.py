@@ -0,0 +1,111 @@
+import pygame
+
+
+# every action and the keys that trigger it, WASD and the arrow keys both
+# work. a key can drive several actions, which one counts depends on the screen.
+KEY_BINDINGS: dict[str, tuple[int, ...]] = {
+    'thrust': (pygame.K_UP, pygame.K_w),
+    'rcs_left': (pygame.K_LEFT, pygame.K_a),
+    'rcs_right': (pygame.K_RIGHT, pygame.K_d),
+    'up': (pygame.K_UP, pygame.K_w),
+    'down': (pygame.K_DOWN, pygame.K_s),
+    'left': (pygame.K_LEFT, pygame.K_a),
+    'right': (pygame.K_RIGHT, pygame.K_d),
+    'submit': (pygame.K_RETURN, pygame.K_KP_ENTER),
+    'continue': (pygame.K_SPACE,),
+    'main_menu': (pygame.K_m,),
+    'show_scores': (pygame.K_t,),
+    'all_versions': (pygame.K_TAB,),
+    'settings': (pygame.K_s,),
+    'restart': (pygame.K_r,),
+    'quit': (pygame.K_q,),
+    'screenshot': (pygame.K_p,),
+    'toggle_profiler': (pygame.K_F3,),
+    'save_trace': (pygame.K_F4,),
+}
+
+# (delay, interval) in seconds: a held key fires once when pressed, again
+# after `delay` and then every `interval`. actions not listed fire once per press.
+KEY_REPEATS: dict[str, tuple[float, float]] = {
+    'up': (0.3, 0.08),
+    'down': (0.3, 0.08),
+    'left': (0.3, 0.08),
+    'right': (0.3, 0.08),
+}
+
+
+class InputHandler:
+    # keyboard state built from KEYDOWN/KEYUP events instead of polling
+    # get_pressed, so presses are edge triggered and nothing ever has to
+    # sleep to slow a held key down. call update() once per frame with that
+    # frame's events, then ask held(), pressed() or triggered().
+    def __init__(
+            self,
+            bindings: dict[str, tuple[int, ...]] = KEY_BINDINGS,
+            repeats: dict[str, tuple[float, float]] = KEY_REPEATS) -> None:
+        self.bindings = bindings
+        self.repeats = repeats
+
+        self.key_actions: dict[int, list[str]] = {}
+        for action, keys in bindings.items():
+            for key in keys:
+                self.key_actions.setdefault(key, []).append(action)
+
+        self.keys: set[int] = set()
+        # actions that went down this frame, and those plus any repeats
+        self.pressed_actions: set[str] = set()
+        self.triggered_actions: set[str] = set()
+        # when each held repeating action fires next
+        self.next_repeat: dict[str, float] = {}
+        self.any_key: bool = False
+        self.quit_requested: bool = False
+        self.time: float = 0.0
+
+    def clear(self) -> None:
+        # forget held keys, e.g. when the window loses focus mid-press
+        self.keys.clear()
+        self.next_repeat.clear()
+
+    def update(self, events: list[pygame.event.Event], dt: float) -> None:
+        self.time += dt
+        self.pressed_actions.clear()
+        self.triggered_actions.clear()
+        self.any_key = False
+
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.quit_requested = True
+            elif event.type == pygame.KEYDOWN:
+                self.any_key = True
+                self.keys.add(event.key)
+                for action in self.key_actions.get(event.key, []):
+                    self.pressed_actions.add(action)
+                    if action in self.repeats:
+                        self.next_repeat[action] = self.time + self.repeats[action][0]
+            elif event.type == pygame.KEYUP:
+                self.keys.discard(event.key)
+            elif event.type == pygame.WINDOWFOCUSLOST:
+                self.clear()
+
+        self.triggered_actions.update(self.pressed_actions)
+        for action, next_time in list(self.next_repeat.items()):
+            if not self.held(action):
+                del self.next_repeat[action]
+            elif action not in self.pressed_actions and self.time >= next_time:
+                # a long frame fires once, it doesn't catch up in a burst
+                self.triggered_actions.add(action)
+                next_time += self.repeats[action][1]
+                if next_time <= self.time:
+                    next_time = self.time + self.repeats[action][1]
+                self.next_repeat[action] = next_time
+
+    def held(self, action: str) -> bool:
+        return any(x in self.keys for x in self.bindings[action])
+
+    def pressed(self, action: str) -> bool:
+        # went down this frame, even if it was already released again
+        return action in self.pressed_actions
+
+    def triggered(self, action: str) -> bool:
+        # pressed, or a repeat of a held key came due this frame
+        return action in self.triggered_actions
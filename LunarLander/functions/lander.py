@@ -1,163 +1,87 @@
 import pygame
-import math
-from os import path
-from datetime import timedelta
 
 from functions.data_structures import *
+from functions.physics import *
+from functions.assets import AssetManager
+from functions.sprite_cache import RotationCache
+
+
+def load_lander_sprites(assets: AssetManager, max_height: int = 50) -> dict[str, pygame.Surface]:
+    return {
+        name: assets.image(
+            'lander', f'lander_{name}.png', height=max_height, rotate=90.0)
+        for name in ('default', 'thruster', 'crashed')}
 
 
 class PlayerLander(pygame.sprite.Sprite):
-    gravity: float
-    x_pos: float
-    y_pos: float
-    angle: float
-    thruster_strength: float
-    max_velocity: float
-    delay_interval: float
-    window_dimensions: tuple[int, int]
-
-    fuel_remaining: float = 100.0
-    max_fuel: float = 100.0
-    x_vel: float = 0.0
-    y_vel: float = 0.0
-    rotation_velocity: float = 0.0
-    mass: float = 10.0
-    lives: int = 3
-    landed: bool = False
-    crashed: bool = False
-    heat: float = 0.0
-    max_heat: float = 100.0
-
-    def __init__(
-            self, x_pos: int, y_pos: int, angle: float,
-            angular_velocity: float,
-            strength: float, heat_coefficient: float,
-            max_velocity: float, abs_path: str,
-            window_dimensions: tuple[int, int],
-            gravity: float) -> None:
+    state: LanderState
+    inputs: LanderInputs
+
+    def __init__(self, state: LanderState, sprites: RotationCache) -> None:
         super().__init__()
 
-        self.gravity = gravity  # lunar gravity is 0.0253 m/s^2. Divide that by the FPS
-        self.x_pos = x_pos
-        self.y_pos = y_pos
-        self.angle = angle - 90.0
-        self.rotation_velocity = angular_velocity
-        self.thruster_strength = strength
-        self.max_velocity = max_velocity
-        self.window_dimensions = window_dimensions
-
-        # OVERHEATING
-        self.overheat_timestamp = datetime.now() - timedelta(seconds=10)
-        self.cooldown_period: timedelta = timedelta(seconds=5)
-        self.thruster_state: bool = False
-
-        self.sprite_default: pygame.image = self.load_sprite(
-            path.join(abs_path, 'assets', 'lander', 'lander_default.png'),
-            50)
-        self.sprite_thruster: pygame.image = self.load_sprite(
-            path.join(abs_path, 'assets', 'lander', 'lander_thruster.png'),
-            50)
-        self.sprite_crashed: pygame.image = self.load_sprite(
-            path.join(abs_path, 'assets', 'lander', 'lander_crashed.png'),
-            50)
-
-        self.heat_coefficient = heat_coefficient
-
-    def load_sprite(self, image_path: str, max_height: int) -> pygame.image:
-        sprite = pygame.image.load(image_path)
-
-        sprite_width, sprite_height = sprite.get_size()
-        scale_factor = max_height / sprite_height
-        sprite = pygame.transform.scale(
-            sprite, (int(sprite_width * scale_factor), int(sprite_height * scale_factor)))
-
-        sprite = pygame.transform.rotate(sprite, 90.0)
-        return sprite
+        # shared between landers, so restarts don't re-rotate anything
+        self.sprites = sprites
+
+        # all of the physics lives in LanderState, this class only draws it
+        self.state = state
+
+        # inputs held since the last frame, applied on every physics step
+        self.inputs = LanderInputs()
+
+        # position before the latest step, for interpolated drawing
+        self.previous_pos: tuple[float, float] = (state.x_pos, state.y_pos)
 
     def thruster_on_cooldown(self) -> bool:
-        # if heat reaches the max, set overheat timestamp to now
-        if self.heat >= self.max_heat:
-            self.overheat_timestamp = datetime.now()
+        return cooldown_active(self.state)
 
-        # returns True if thursters CANNOT be fired
-        difference = datetime.now() - self.overheat_timestamp
-        return difference <= self.cooldown_period
+    def cooldown_remaining(self) -> float:
+        return cooldown_remaining(self.state)
 
     def heat_warning(self) -> bool:
-        # returns true if hot
-        return self.heat >= (self.max_heat * 0.8)
-
-    def thruster_conditions(self) -> bool:
-        # return True if thrusters CAN be fired
-        return (
-            self.fuel_remaining > 0 and
-            not self.landed and
-            not self.thruster_on_cooldown())
+        return heat_warning(self.state)
 
     def fire_rcs(self, rcs_force: float) -> None:
-        if self.thruster_conditions():
-            self.fuel_remaining -= self.thruster_strength
-            self.rotation_velocity += rcs_force
-            self.heat += self.heat_coefficient
-
-    def fire_thruster(self) -> None:
-        if self.thruster_conditions():
-            self.thruster_state = True
-            self.fuel_remaining -= self.thruster_strength
-            angle_radians = math.radians(self.angle)
-            force_x = self.thruster_strength * math.cos(angle_radians)
-            force_y = self.thruster_strength * math.sin(angle_radians)
-            self.x_vel -= force_x / self.mass
-            self.y_vel += force_y / self.mass
-            self.heat += self.heat_coefficient
-
-    def attempt_landing(self) -> None:
-        self.landed = True
-        self.rotation_velocity = 0
-        # must not be more than 10 degrees off true vertical (which is 270, idk why)
-        valid_landing_angle = self.angle > 260 and self.angle < 280
-        self.crashed = self.max_velocity <= (
-            self.y_vel + self.x_vel) or not valid_landing_angle
-
-    def update(self) -> tuple[pygame.Surface, float, float]:
-        self.angle = (self.angle + self.rotation_velocity) % 360
-        if self.thruster_state:
-            sprite_copy = pygame.transform.rotate(
-                self.sprite_thruster, self.angle)
-            self.thruster_state = False
-        elif self.crashed:
-            sprite_copy = pygame.transform.rotate(
-                self.sprite_crashed, self.angle)
+        if rcs_force > 0:
+            self.inputs.left = True
         else:
-            sprite_copy = pygame.transform.rotate(
-                self.sprite_default, self.angle)
-
-        sprite_width, sprite_height = sprite_copy.get_size()
+            self.inputs.right = True
 
-        x_min = 0 - sprite_width
-        x_max = self.window_dimensions[0] + sprite_width
+    def fire_thruster(self) -> None:
+        self.inputs.thrust = True
 
-        # if ship is on the boundary bottom, stop all movement (landed)
-        if self.y_pos >= self.window_dimensions[1] - sprite_height and not self.landed:
-            self.attempt_landing()
+    def update(self, dt: float = 1 / TICK_RATE) -> None:
+        self.previous_pos = (self.state.x_pos, self.state.y_pos)
+        step(self.state, self.inputs, dt)
 
-        elif not self.landed:
-            # check if sprite is outside of boundary X fields
-            if self.x_pos < x_min:
-                self.x_pos = x_max - 1
-            elif self.x_pos > x_max:
-                self.x_pos = x_min + 1
+    def interpolated_pos(self, alpha: float) -> tuple[float, float]:
+        # blend between the last two physics steps, alpha is the fraction of
+        # a step left over in the accumulator
+        prev_x, prev_y = self.previous_pos
+        x_pos, y_pos = self.state.x_pos, self.state.y_pos
 
-            heat_reduce = self.heat - (self.heat_coefficient / 10)
-            self.heat = heat_reduce if heat_reduce > 0 else 0
+        # don't smear the sprite across the screen when it wraps around
+        if abs(x_pos - prev_x) > self.state.window_dimensions[0] / 2:
+            return x_pos, y_pos
 
-            self.y_vel += self.gravity
+        return (
+            prev_x + (x_pos - prev_x) * alpha,
+            prev_y + (y_pos - prev_y) * alpha)
+
+    def render(self, alpha: float = 1.0) -> tuple[pygame.Surface, float, float]:
+        if self.state.thrusting:
+            sprite_name = 'thruster'
+        elif self.state.crashed:
+            sprite_name = 'crashed'
+        else:
+            sprite_name = 'default'
+        sprite_copy = self.sprites.get(sprite_name, self.state.angle)
 
-            self.y_pos += self.y_vel
-            self.x_pos += self.x_vel
+        sprite_width, sprite_height = sprite_copy.get_size()
+        x_pos, y_pos = self.interpolated_pos(alpha)
 
         return (
             sprite_copy,
-            self.x_pos - int(sprite_width / 2),
-            self.y_pos - int(sprite_height / 2)
+            x_pos - int(sprite_width / 2),
+            y_pos - int(sprite_height / 2)
         )
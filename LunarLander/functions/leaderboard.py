@@ -0,0 +1,64 @@
+import heapq
+
+from functions.data_structures import *
+from functions.utilities import *
+
+
+class Leaderboard:
+    # top `size` scores per major.minor version, kept in a min-heap so the
+    # lowest qualifying score is always at the front. adding is O(log K),
+    # qualification is O(1) and the sorted table is cached between changes.
+    # with all_versions every version shares one table, for scores that
+    # were rescored to be comparable.
+    def __init__(self, size: int = 10, all_versions: bool = False) -> None:
+        self.size = size
+        self.all_versions = all_versions
+        self.heaps: dict[tuple[int, int], list[tuple[int, int, ScoreEntry]]] = {}
+        self.sorted: dict[tuple[int, int], list[ScoreEntry]] = {}
+
+        # bumped whenever any table changes, handy as a cache key
+        self.revision: int = 0
+        self.sequence: int = 0
+
+    def key(self, version: str) -> tuple[int, ...]:
+        return () if self.all_versions else major_minor(version)
+
+    def qualifies(self, version: str, score: int) -> bool:
+        if score == 0:
+            return False
+
+        heap = self.heaps.get(self.key(version), [])
+        return len(heap) < self.size or score > heap[0][0]
+
+    def add(self, entry: ScoreEntry) -> bool:
+        # returns True if the entry made it onto its version's table
+        key = self.key(entry.game_version)
+        heap = self.heaps.setdefault(key, [])
+
+        # on equal scores the newest entry sits at the front and is dropped first
+        self.sequence += 1
+        item = (entry.score, -self.sequence, entry)
+
+        if len(heap) < self.size:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+        else:
+            return False
+
+        self.sorted.pop(key, None)
+        self.revision += 1
+        return True
+
+    def add_many(self, entries: list[ScoreEntry]) -> None:
+        for entry in entries:
+            self.add(entry)
+
+    def top(self, version: str) -> list[ScoreEntry]:
+        key = self.key(version)
+        table = self.sorted.get(key)
+        if table is None:
+            table = [x[2] for x in sorted(
+                self.heaps.get(key, []), key=lambda x: x[:2], reverse=True)]
+            self.sorted[key] = table
+        return table
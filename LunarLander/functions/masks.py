@@ -0,0 +1,110 @@
+from collections import OrderedDict
+from os import path
+
+import numpy as np
+import pygame
+
+from functions.assets import AssetManager
+from functions.collision import *
+from functions.lander import load_lander_sprites
+from functions.sprite_cache import RotationCache
+
+
+class MaskCache:
+    # pixel masks of the rotated sprites in a RotationCache, keyed the same
+    # way (sprite name, angle bucket) and dropped least recently used past
+    # max_entries. warm() builds them all up front so masks are never made
+    # during a frame.
+    def __init__(
+            self, sprites: RotationCache,
+            max_entries: int | None = None) -> None:
+        self.sprites = sprites
+        self.max_entries = (
+            max_entries if max_entries is not None else sprites.buckets * len(sprites.sprites))
+
+        self.masks: OrderedDict[tuple[str, int], pygame.mask.Mask] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def build(self, name: str, bucket: int) -> pygame.mask.Mask:
+        mask = pygame.mask.from_surface(
+            self.sprites.get(name, bucket * self.sprites.angle_step))
+        self.masks[(name, bucket)] = mask
+        if len(self.masks) > self.max_entries:
+            self.masks.popitem(last=False)
+            self.evictions += 1
+        return mask
+
+    def get(self, name: str, angle: float) -> pygame.mask.Mask:
+        key = (name, self.sprites.bucket(angle))
+        mask = self.masks.get(key)
+        if mask is None:
+            self.misses += 1
+            return self.build(*key)
+
+        self.hits += 1
+        self.masks.move_to_end(key)
+        return mask
+
+    def warm(self, names: list[str] | None = None) -> None:
+        for name in names if names is not None else self.sprites.sprites:
+            for bucket in range(self.sprites.buckets):
+                if len(self.masks) >= self.max_entries:
+                    return
+                if (name, bucket) not in self.masks:
+                    self.build(name, bucket)
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self.masks),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+def mask_bottoms(mask: pygame.mask.Mask) -> np.ndarray:
+    # bottom edge of the lowest set pixel in every column, -1 if it's empty
+    pixels = pygame.surfarray.array_red(mask.to_surface()) > 0
+    rows = np.arange(1, mask.get_size()[1] + 1)
+    return np.where(pixels.any(axis=1), (pixels * rows).max(axis=1), -1)
+
+
+def build_profiles(
+        masks: MaskCache,
+        names: tuple[str, ...] = COLLISION_SPRITES) -> CollisionProfiles:
+    # every angle bucket of every sprite in `names`, as CollisionProfiles
+    buckets = masks.sprites.buckets
+    rows = [
+        [masks.get(name, bucket * masks.sprites.angle_step) for bucket in range(buckets)]
+        for name in names]
+    widest = max(x.get_size()[0] for row in rows for x in row)
+
+    widths = np.zeros((len(names), buckets), dtype=np.int64)
+    heights = np.zeros((len(names), buckets), dtype=np.int64)
+    bottoms = np.full((len(names), buckets, widest), -1, dtype=np.int64)
+    for sprite, row in enumerate(rows):
+        for bucket, mask in enumerate(row):
+            widths[sprite, bucket], heights[sprite, bucket] = mask.get_size()
+            bottoms[sprite, bucket, :widths[sprite, bucket]] = mask_bottoms(mask)
+    return CollisionProfiles(masks.sprites.angle_step, widths, heights, bottoms)
+
+
+# profiles by sprite size, replays and training only build them once
+LOADED_PROFILES: dict[tuple[tuple[int, int], float], CollisionProfiles] = {}
+
+
+def load_profiles(size: tuple[int, int], angle_step: float = 1.0) -> CollisionProfiles:
+    # the game's collision profiles without a window, for the replay
+    # player and anything else flying headless
+    key = (tuple(size), angle_step)
+    if key not in LOADED_PROFILES:
+        assets = AssetManager(path.dirname(path.dirname(path.abspath(__file__))))
+        sprites = load_lander_sprites(assets, max_height=size[1])
+        if sprites['default'].get_size() != tuple(size):
+            raise ValueError(f'ERROR: no lander sprites are {size[0]}x{size[1]}')
+        LOADED_PROFILES[key] = build_profiles(
+            MaskCache(RotationCache(sprites, angle_step=angle_step)))
+    return LOADED_PROFILES[key]
@@ -0,0 +1,245 @@
+import math
+from dataclasses import dataclass, field
+
+from functions.data_structures import DifficultySettings
+from functions.terrain import *
+from functions.collision import CollisionProfiles
+
+
+# the lander rules were tuned against one update per frame at 60 fps,
+# so every per-update quantity below is scaled by dt * TICK_RATE
+TICK_RATE: int = 60
+
+
+def gravity_per_tick(gravity: float) -> float:
+    # difficulty gravity is given per millisecond, physics runs per tick
+    return gravity / (1000 / TICK_RATE)
+
+
+@dataclass
+class LanderInputs:
+    thrust: bool = False
+    left: bool = False
+    right: bool = False
+
+
+@dataclass
+class LanderState:
+    x_pos: float
+    y_pos: float
+    window_dimensions: tuple[int, int]
+    gravity: float
+    max_velocity: float
+    heat_coefficient: float
+
+    angle: float = 0.0
+    x_vel: float = 0.0
+    y_vel: float = 0.0
+    rotation_velocity: float = 0.0
+    thruster_strength: float = 0.25
+    rcs_strength: float = 0.25
+    mass: float = 10.0
+
+    fuel_remaining: float = 100.0
+    max_fuel: float = 100.0
+    heat: float = 0.0
+    max_heat: float = 100.0
+
+    # unrotated sprite size, used as the collision box
+    size: tuple[int, int] = (50, 50)
+
+    # simulated seconds since the flight started
+    time: float = 0.0
+    overheat_time: float = -10.0
+    cooldown_period: float = 5.0
+
+    thrusting: bool = False
+    landed: bool = False
+    crashed: bool = False
+    on_pad: bool = False
+
+    # ground to land on, None is the flat ground of replays from before
+    # the terrain existed
+    terrain: Terrain | None = field(default=None, compare=False, repr=False)
+    # the sprites' pixels to touch the terrain with, None checks the
+    # rotated bounding box like replays from before the masks
+    collision: CollisionProfiles | None = field(default=None, compare=False, repr=False)
+
+
+def launch_state(
+        difficulty: DifficultySettings,
+        window_dimensions: tuple[int, int],
+        size: tuple[int, int] = (50, 50),
+        terrain: Terrain | None = None,
+        collision: CollisionProfiles | None = None) -> LanderState:
+    # every flight starts on the left edge, a quarter of the way down,
+    # pointing up. the game and the replay player both start from here.
+    return LanderState(
+        x_pos=1,
+        y_pos=int(window_dimensions[1] / 4),
+        angle=0.0,
+        x_vel=difficulty.starting_velocity,
+        rotation_velocity=difficulty.starting_angular_velocity,
+        thruster_strength=0.25,
+        heat_coefficient=difficulty.heat_coefficient,
+        max_velocity=difficulty.max_speed,
+        window_dimensions=window_dimensions,
+        gravity=gravity_per_tick(difficulty.gravity),  # lunar gravity per physics tick
+        size=size,
+        terrain=terrain,
+        collision=collision)
+
+
+def rotated_size(width: int, height: int, angle: float) -> tuple[int, int]:
+    # same bounding box math as pygame.transform.rotate, without a surface
+    radians = math.radians(angle)
+    cos_a, sin_a = math.cos(radians), math.sin(radians)
+    cx, cy = cos_a * width, cos_a * height
+    sx, sy = sin_a * width, sin_a * height
+    new_width = max(abs(cx + sy), abs(cx - sy), abs(-cx + sy), abs(-cx - sy))
+    new_height = max(abs(sx + cy), abs(sx - cy), abs(-sx + cy), abs(-sx - cy))
+    return int(new_width), int(new_height)
+
+
+def thruster_on_cooldown(state: LanderState) -> bool:
+    # if heat reaches the max, start the cooldown from now
+    if state.heat >= state.max_heat:
+        state.overheat_time = state.time
+
+    # returns True if thrusters CANNOT be fired
+    return state.time - state.overheat_time <= state.cooldown_period
+
+
+def cooldown_start(state: LanderState) -> float:
+    # when the current cooldown started, without starting one. a maxed out
+    # heat gauge starts it the next time the thrusters are tried.
+    return state.time if state.heat >= state.max_heat else state.overheat_time
+
+
+def cooldown_active(state: LanderState) -> bool:
+    # read only thruster_on_cooldown for drawing, so the renderer can never
+    # change a flight and replays stay exact
+    return state.time - cooldown_start(state) <= state.cooldown_period
+
+
+def cooldown_remaining(state: LanderState) -> float:
+    return state.cooldown_period - (state.time - cooldown_start(state))
+
+
+def heat_warning(state: LanderState) -> bool:
+    # returns true if hot
+    return state.heat >= (state.max_heat * 0.8)
+
+
+def thruster_conditions(state: LanderState) -> bool:
+    # return True if thrusters CAN be fired
+    return (
+        state.fuel_remaining > 0 and
+        not state.landed and
+        not thruster_on_cooldown(state))
+
+
+def fire_rcs(state: LanderState, rcs_force: float, scale: float = 1.0) -> None:
+    if thruster_conditions(state):
+        state.fuel_remaining -= state.thruster_strength * scale
+        state.rotation_velocity += rcs_force * scale
+        state.heat += state.heat_coefficient * scale
+
+
+def fire_thruster(state: LanderState, scale: float = 1.0) -> None:
+    if thruster_conditions(state):
+        state.thrusting = True
+        state.fuel_remaining -= state.thruster_strength * scale
+        angle_radians = math.radians(state.angle)
+        force_x = state.thruster_strength * math.cos(angle_radians)
+        force_y = state.thruster_strength * math.sin(angle_radians)
+        state.x_vel -= force_x / state.mass * scale
+        state.y_vel += force_y / state.mass * scale
+        state.heat += state.heat_coefficient * scale
+
+
+def feet(state: LanderState) -> tuple[float, float]:
+    # left and right edge of the unrotated lander, where the legs touch down
+    half_width = state.size[0] / 2
+    return state.x_pos - half_width, state.x_pos + half_width
+
+
+def ground_below(state: LanderState) -> float:
+    # screen y the lander's feet would touch down on
+    if state.terrain is None:
+        return state.window_dimensions[1] - GROUND_HEIGHT
+    return state.terrain.highest(*feet(state))
+
+
+def touching_ground(state: LanderState, sprite_width: int, sprite_height: int) -> bool:
+    if state.terrain is None:
+        # flat ground: the original check, kept as is so old replays match
+        return state.y_pos >= state.window_dimensions[1] - sprite_height
+
+    if state.collision is not None:
+        # the sprite's opaque pixels against the terrain column under them
+        return state.collision.touching(
+            state.terrain, state.x_pos, state.y_pos, state.angle, state.thrusting)
+
+    # the bottom of the rotated sprite against the highest ground under it
+    half_width = sprite_width / 2
+    return state.y_pos + sprite_height / 2 >= state.terrain.highest(
+        state.x_pos - half_width, state.x_pos + half_width)
+
+
+def attempt_landing(state: LanderState) -> None:
+    state.landed = True
+    state.rotation_velocity = 0
+    # must not be more than 10 degrees off true vertical (which is 270, idk why)
+    valid_landing_angle = state.angle > 260 and state.angle < 280
+    state.crashed = state.max_velocity <= (
+        state.y_vel + state.x_vel) or not valid_landing_angle
+
+    if state.terrain is not None:
+        # pads are always flat, open ground has to be gentle enough
+        left, right = feet(state)
+        state.on_pad = state.terrain.pad_under(left, right) >= 0
+        rise = state.terrain.lowest(left, right) - state.terrain.highest(left, right)
+        if not state.on_pad and rise > MAX_LANDING_SLOPE * state.size[0]:
+            state.crashed = True
+
+
+def step(state: LanderState, inputs: LanderInputs, dt: float) -> LanderState:
+    scale = dt * TICK_RATE
+    state.time += dt
+    state.thrusting = False
+
+    if not state.landed:
+        if inputs.thrust:
+            fire_thruster(state, scale)
+        if inputs.left:
+            fire_rcs(state, state.rcs_strength, scale)
+        if inputs.right:
+            fire_rcs(state, -state.rcs_strength, scale)
+
+    state.angle = (state.angle + state.rotation_velocity * scale) % 360
+    sprite_width, sprite_height = rotated_size(*state.size, state.angle)
+
+    x_min = 0 - sprite_width
+    x_max = state.window_dimensions[0] + sprite_width
+
+    # if ship is on the ground, stop all movement (landed)
+    if not state.landed and touching_ground(state, sprite_width, sprite_height):
+        attempt_landing(state)
+
+    elif not state.landed:
+        # check if sprite is outside of boundary X fields
+        if state.x_pos < x_min:
+            state.x_pos = x_max - 1
+        elif state.x_pos > x_max:
+            state.x_pos = x_min + 1
+
+        heat_reduce = state.heat - (state.heat_coefficient / 10) * scale
+        state.heat = heat_reduce if heat_reduce > 0 else 0
+
+        state.y_vel += state.gravity * scale
+
+        state.y_pos += state.y_vel * scale
+        state.x_pos += state.x_vel * scale
+
+    return state
@@ -0,0 +1,162 @@
+import json
+import time
+
+import numpy as np
+import pygame
+
+from functions.colors import *
+from functions.text import TextRenderer
+
+
+# the parts of one game loop iteration, in the order they run
+FRAME_STAGES: tuple[str, ...] = (
+    'tick', 'clear', 'menu', 'physics', 'flight_time', 'landing',
+    'graphics', 'hud', 'events', 'overlay', 'present')
+
+
+class FrameProfiler:
+    # per-stage durations of the last `capacity` frames. every frame is a
+    # row of a fixed numpy ring buffer, so recording never allocates and the
+    # oldest frames are simply overwritten. stages are timed as laps: each
+    # lap() closes the stage that ran since the previous one.
+    def __init__(
+            self, stages: tuple[str, ...] = FRAME_STAGES,
+            capacity: int = 600) -> None:
+        self.stages = stages
+        self.stage_index: dict[str, int] = {x: i for i, x in enumerate(stages)}
+        self.capacity = capacity
+
+        # seconds since `origin`, one row per frame
+        self.origin: float = time.perf_counter()
+        self.frame_starts = np.zeros(capacity, dtype=np.float64)
+        self.frame_times = np.zeros(capacity, dtype=np.float64)
+        self.stage_starts = np.zeros((capacity, len(stages)), dtype=np.float64)
+        self.stage_times = np.zeros((capacity, len(stages)), dtype=np.float64)
+
+        # frames recorded so far, the ring holds the last `capacity` of them
+        self.frames: int = 0
+        self.row: int = 0
+        self.last_lap: float = 0.0
+
+    def begin_frame(self) -> None:
+        self.row = self.frames % self.capacity
+        self.stage_starts[self.row] = 0.0
+        self.stage_times[self.row] = 0.0
+        self.last_lap = time.perf_counter() - self.origin
+        self.frame_starts[self.row] = self.last_lap
+
+    def lap(self, stage: str) -> None:
+        current = time.perf_counter() - self.origin
+        index = self.stage_index[stage]
+        if self.stage_times[self.row, index] == 0.0:
+            self.stage_starts[self.row, index] = self.last_lap
+        self.stage_times[self.row, index] += current - self.last_lap
+        self.last_lap = current
+
+    def end_frame(self) -> None:
+        self.frame_times[self.row] = self.last_lap - self.frame_starts[self.row]
+        self.frames += 1
+
+    def recorded(self) -> int:
+        return min(self.frames, self.capacity)
+
+    def recent(self, count: int | None = None) -> np.ndarray:
+        # ring rows of the last `count` frames, oldest first
+        count = self.recorded() if count is None else min(count, self.recorded())
+        return np.arange(self.frames - count, self.frames) % self.capacity
+
+    def summary(self, count: int | None = None) -> dict:
+        # milliseconds per stage (and for the whole frame) over the last
+        # `count` frames
+        rows = self.recent(count)
+        if len(rows) == 0:
+            return {}
+
+        def stats(seconds: np.ndarray) -> dict:
+            milliseconds = seconds * 1000
+            return {
+                'mean_ms': round(float(milliseconds.mean()), 4),
+                'p50_ms': round(float(np.percentile(milliseconds, 50)), 4),
+                'p99_ms': round(float(np.percentile(milliseconds, 99)), 4),
+                'max_ms': round(float(milliseconds.max()), 4),
+            }
+
+        summary = {'frame': stats(self.frame_times[rows])}
+        for index, stage in enumerate(self.stages):
+            summary[stage] = stats(self.stage_times[rows, index])
+        return summary
+
+    def chrome_trace(self) -> dict:
+        # Trace Event Format, load it in chrome://tracing or ui.perfetto.dev.
+        # every frame is one complete event with its stages nested inside.
+        events = []
+        first_frame = self.frames - self.recorded()
+        for offset, row in enumerate(self.recent()):
+            events.append({
+                'name': 'frame', 'ph': 'X', 'pid': 1, 'tid': 1,
+                'ts': round(self.frame_starts[row] * 1e6, 3),
+                'dur': round(self.frame_times[row] * 1e6, 3),
+                'args': {'frame': first_frame + offset}})
+            for index, stage in enumerate(self.stages):
+                duration = self.stage_times[row, index]
+                if duration > 0.0:
+                    events.append({
+                        'name': stage, 'ph': 'X', 'pid': 1, 'tid': 1,
+                        'ts': round(self.stage_starts[row, index] * 1e6, 3),
+                        'dur': round(duration * 1e6, 3)})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_trace(self, trace_path: str) -> None:
+        with open(trace_path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+class ProfilerOverlay:
+    # frame time graph plus a per-stage breakdown, drawn in a corner of the
+    # canvas. the graph is one polyline, the numbers come from the glyph atlas.
+    def __init__(
+            self, profiler: FrameProfiler, font: pygame.font.Font,
+            size: tuple[int, int] = (240, 60),
+            budget: float = 1 / 60,
+            summary_frames: int = 60) -> None:
+        self.profiler = profiler
+        self.text = TextRenderer(font)
+        self.text.warm_glyphs([white, red])
+        self.size = size
+        self.budget = budget
+        self.summary_frames = summary_frames
+
+    def draw(self, canvas: pygame.Surface, pos: tuple[int, int]) -> pygame.Rect:
+        x_pos, y_pos = pos
+        width, height = self.size
+        area = pygame.Rect(x_pos, y_pos, width, height)
+        pygame.draw.rect(canvas, black, area)
+
+        # frame times, the budget line sits halfway up the graph
+        rows = self.profiler.recent(width)
+        if len(rows) > 1:
+            frame_times = self.profiler.frame_times[rows]
+            heights = np.minimum(frame_times / (2 * self.budget), 1.0) * (height - 1)
+            xs = x_pos + width - len(rows) + np.arange(len(rows))
+            ys = y_pos + height - 1 - heights
+            pygame.draw.lines(canvas, white, False, np.stack([xs, ys], axis=1).tolist())
+        budget_y = y_pos + height // 2
+        pygame.draw.line(canvas, red, (x_pos, budget_y), (x_pos + width - 1, budget_y))
+        pygame.draw.rect(canvas, white, area, 1)
+
+        # mean and worst milliseconds over the last few frames
+        rows = self.profiler.recent(self.summary_frames)
+        if len(rows) == 0:
+            return area
+        frame_times = self.profiler.frame_times[rows] * 1000
+        stage_times = self.profiler.stage_times[rows] * 1000
+        lines = [('frame', frame_times.mean(), frame_times.max())] + list(zip(
+            self.profiler.stages, stage_times.mean(axis=0), stage_times.max(axis=0)))
+
+        y_pos += height + 2
+        for stage, mean, worst in lines:
+            color = red if stage == 'frame' and mean > self.budget * 1000 else white
+            area.union_ip(self.text.blit_readout(
+                canvas, f'{stage:<13}', f'{mean:.3f} {worst:.3f}', (x_pos, y_pos), color))
+            y_pos += self.text.line_height
+        return area
@@ -0,0 +1,148 @@
+import struct
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from functions.data_structures import *
+from functions.physics import *
+from functions.batch import pack_inputs, unpack_inputs
+from functions.masks import load_profiles
+
+
+# magic, format version, difficulty preset, difficulty seed, tick rate,
+# window width and height, sprite width and height, tick count
+REPLAY_HEADER = struct.Struct('<4sBBIHHHHHI')
+REPLAY_MAGIC: bytes = b'LLRP'
+# 1: flat ground, 2: terrain generated from the difficulty seed,
+# 3: terrain and pixel collision with the lander sprites
+REPLAY_VERSION: int = 3
+REPLAY_VERSIONS: tuple[int, ...] = (1, 2, 3)
+
+# thrust, left and right, one bit each per tick
+INPUT_BITS: int = 3
+
+
+@dataclass
+class Replay:
+    difficulty_preset: int
+    seed: int
+    window_dimensions: tuple[int, int]
+    size: tuple[int, int]
+    inputs: np.ndarray  # one packed uint8 per physics tick
+    tick_rate: int = TICK_RATE
+    version: int = REPLAY_VERSION
+
+    def difficulty(self) -> DifficultySettings:
+        return DifficultySettings(self.difficulty_preset, seed=self.seed)
+
+    def terrain(self, difficulty: DifficultySettings | None = None) -> Terrain | None:
+        if self.version < 2:
+            return None
+        difficulty = difficulty if difficulty is not None else self.difficulty()
+        return difficulty_terrain(difficulty, self.window_dimensions)
+
+    def collision(self) -> CollisionProfiles | None:
+        if self.version < 3:
+            return None
+        return load_profiles(self.size)
+
+    def duration(self) -> float:
+        return len(self.inputs) / self.tick_rate
+
+
+def encode_replay(replay: Replay) -> bytes:
+    # keep the low 3 bits of every tick and pack them end to end, held keys
+    # make long runs that zlib squeezes down to a few bytes per second
+    inputs = np.asarray(replay.inputs, dtype=np.uint8)
+    bits = np.unpackbits(inputs[:, None], axis=1)[:, -INPUT_BITS:]
+    header = REPLAY_HEADER.pack(
+        REPLAY_MAGIC, replay.version, replay.difficulty_preset, replay.seed,
+        replay.tick_rate, *replay.window_dimensions, *replay.size, len(inputs))
+    return header + zlib.compress(np.packbits(bits).tobytes(), 9)
+
+
+def decode_replay(data: bytes) -> Replay:
+    (magic, version, preset, seed, tick_rate,
+     width, height, size_width, size_height, ticks) = REPLAY_HEADER.unpack_from(data)
+    if magic != REPLAY_MAGIC or version not in REPLAY_VERSIONS:
+        raise ValueError(f'ERROR: unsupported replay format: {magic!r} v{version}')
+
+    packed = np.frombuffer(zlib.decompress(data[REPLAY_HEADER.size:]), dtype=np.uint8)
+    bits = np.unpackbits(packed)[:ticks * INPUT_BITS].reshape(ticks, INPUT_BITS)
+    inputs = (bits @ (1 << np.arange(INPUT_BITS - 1, -1, -1))).astype(np.uint8)
+
+    return Replay(
+        difficulty_preset=preset, seed=seed,
+        window_dimensions=(width, height), size=(size_width, size_height),
+        inputs=inputs, tick_rate=tick_rate, version=version)
+
+
+class ReplayRecorder:
+    # inputs applied on every physics tick of one flight, appended to a
+    # bytearray as they happen and encoded once when the flight ends.
+    # flights over flat ground (terrain=False) are kept as version 1 and
+    # ones colliding by bounding box (collision=False) as version 2.
+    def __init__(
+            self, difficulty: DifficultySettings,
+            window_dimensions: tuple[int, int],
+            size: tuple[int, int] = (50, 50),
+            terrain: bool = True,
+            collision: bool = True) -> None:
+        self.difficulty = difficulty
+        self.window_dimensions = window_dimensions
+        self.size = size
+        self.version = 1 if not terrain else REPLAY_VERSION if collision else 2
+        self.inputs = bytearray()
+
+    def record(self, inputs: LanderInputs) -> None:
+        self.inputs.append(pack_inputs(inputs))
+
+    def replay(self) -> Replay:
+        return Replay(
+            difficulty_preset=self.difficulty.difficulty_preset,
+            seed=self.difficulty.seed,
+            window_dimensions=self.window_dimensions,
+            size=self.size,
+            inputs=np.frombuffer(bytes(self.inputs), dtype=np.uint8),
+            version=self.version)
+
+    def finish(self) -> bytes:
+        return encode_replay(self.replay())
+
+
+def play_replay(replay: Replay, difficulty: DifficultySettings | None = None) -> LanderState:
+    # re-run the flight tick by tick through the same physics as the game
+    difficulty = difficulty if difficulty is not None else replay.difficulty()
+    state = launch_state(
+        difficulty, replay.window_dimensions, replay.size,
+        replay.terrain(difficulty), replay.collision())
+    dt = 1 / replay.tick_rate
+    for bits in replay.inputs.tolist():
+        step(state, unpack_inputs(bits), dt)
+        if state.landed:
+            break
+    return state
+
+
+def entry_from_state(
+        state: LanderState, difficulty: DifficultySettings,
+        name: str, game_version: str) -> ScoreEntry:
+    # the ScoreEntry the game submits for a finished flight
+    entry = ScoreEntry(
+        name=name,
+        game_version=game_version,
+        flight_time=round(state.time, 2),
+        fuel_remaining=round(state.fuel_remaining, 2),
+        heat=round(state.heat, 2),
+        difficulty_settings=difficulty,
+        crashed=state.crashed,
+        on_pad=state.on_pad)
+    if state.landed:
+        entry.calculate_score()
+    return entry
+
+
+def replay_entry(replay: Replay, name: str, game_version: str) -> ScoreEntry:
+    difficulty = replay.difficulty()
+    return entry_from_state(play_replay(replay, difficulty), difficulty, name, game_version)
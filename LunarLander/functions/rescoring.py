@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+
+# run columns by name: flight_time, fuel_remaining, heat, crashed,
+# score_multiplier and optionally on_pad, one entry per stored run
+Columns = dict[str, np.ndarray]
+
+
+@dataclass
+class ScoreRule:
+    achievement: str
+    bonus: int
+    applies: Callable[[Columns], np.ndarray]
+
+
+@dataclass
+class ScoreFormula:
+    # within a group only the first matching rule pays out, like the
+    # if/elif chains in ScoreEntry.calculate_score. every rule gets one bit
+    # in the achievement mask, in the order the rules are listed.
+    groups: list[list[ScoreRule]]
+    fuel_weight: float = 2.0
+
+    def rules(self) -> list[ScoreRule]:
+        return [rule for group in self.groups for rule in group]
+
+    def achievements(self) -> list[str]:
+        return [rule.achievement for rule in self.rules()]
+
+
+# the formula ScoreEntry.calculate_score implements, including the V1.0.3
+# fuel weighting
+CURRENT_FORMULA = ScoreFormula(groups=[
+    [
+        # nothing but fumes - land successfully with with no fuel remaining
+        ScoreRule('Nothing but fumes', 1000, lambda x: x['fuel_remaining'] == 0),
+        ScoreRule('Fuel efficient', 600, lambda x: x['fuel_remaining'] >= 90.0),
+    ],
+    [
+        ScoreRule('Speed Demon', 1000, lambda x: x['flight_time'] <= 7.5),
+        # No time for chit-chat - land successfully in less than n seconds
+        ScoreRule('No time for chit-chat', 600, lambda x: x['flight_time'] <= 15.0),
+        ScoreRule('Nice', 69, lambda x: np.trunc(x['flight_time']) == 69),
+        # Dilly-dallying - land successfully after more than 120 seconds
+        ScoreRule('Dilly-dallying', 100, lambda x: np.trunc(x['flight_time']) >= 120),
+    ],
+    [
+        # coming in hot - land successfully with heat above 95%
+        ScoreRule('Coming in hot', 600, lambda x: x['heat'] >= 95.0),
+        # cool as a cucumber - land with less than 2.5% heat
+        ScoreRule('Cool as a cucumber', 1000, lambda x: x['heat'] <= 2.5),
+    ],
+    [
+        # right on target - land on one of the landing pads (runs from
+        # before the terrain have no on_pad column and never did)
+        ScoreRule('Right on target', 500, lambda x: np.asarray(x.get('on_pad', False), dtype=bool)),
+    ],
+])
+
+
+def score_runs(
+        columns: Columns,
+        formula: ScoreFormula = CURRENT_FORMULA) -> tuple[np.ndarray, np.ndarray]:
+    # returns (scores, achievement masks) for every run at once. crashed
+    # runs score 0. a zero flight time has no fuel efficiency bonus instead
+    # of the ZeroDivisionError calculate_score would raise.
+    flight_time = np.asarray(columns['flight_time'], dtype=np.float64)
+    landed = ~np.asarray(columns['crashed'], dtype=bool)
+
+    scores = np.zeros(len(flight_time), dtype=np.int64)
+    masks = np.zeros(len(flight_time), dtype=np.uint32)
+
+    bit = 0
+    for group in formula.groups:
+        unmatched = landed.copy()
+        for rule in group:
+            hit = unmatched & rule.applies(columns)
+            scores[hit] += rule.bonus
+            masks[hit] |= np.uint32(1 << bit)
+            unmatched &= ~hit
+            bit += 1
+
+    fuel = np.asarray(columns['fuel_remaining'], dtype=np.float64) * formula.fuel_weight
+    efficiency = np.divide(
+        fuel, flight_time, out=np.zeros_like(fuel), where=flight_time != 0) * 100
+    scores += np.trunc(efficiency).astype(np.int64)
+
+    multiplier = np.asarray(columns['score_multiplier'], dtype=np.float64)
+    scores = np.trunc(scores * multiplier).astype(np.int64)
+    scores[~landed] = 0
+    return scores, masks
+
+
+def achievement_names(mask: int, formula: ScoreFormula = CURRENT_FORMULA) -> list[str]:
+    return [name for bit, name in enumerate(formula.achievements()) if mask & (1 << bit)]
+
+
+def achievement_lists(masks: np.ndarray, formula: ScoreFormula = CURRENT_FORMULA) -> list[list[str]]:
+    # only a handful of distinct masks exist, so decode each once
+    unique, inverse = np.unique(masks, return_inverse=True)
+    decoded = [achievement_names(int(x), formula) for x in unique]
+    return [decoded[x] for x in inverse.reshape(-1)]
+
+
+def achievement_counts(masks: np.ndarray, formula: ScoreFormula = CURRENT_FORMULA) -> dict[str, int]:
+    return {
+        name: int(np.count_nonzero(masks & np.uint32(1 << bit)))
+        for bit, name in enumerate(formula.achievements())}
@@ -0,0 +1,195 @@
+import json
+import sqlite3
+from os import path
+from typing import Iterator
+
+import numpy as np
+
+from functions.data_structures import *
+from functions.utilities import *
+from functions.rescoring import CURRENT_FORMULA, ScoreFormula, achievement_names, score_runs
+
+
+# columns in the order rows are read back into ScoreEntry
+SCORE_COLUMNS: tuple[str, ...] = (
+    'name', 'game_version', 'flight_time', 'fuel_remaining', 'heat',
+    'crashed', 'difficulty_settings', 'score', 'timestamp', 'achievements',
+    'replay', 'on_pad')
+
+
+class ScoreStore:
+    # every run ever submitted, in SQLite. the index on major.minor version
+    # and score answers leaderboard questions without reading the history.
+    def __init__(self, db_path: str, legacy_json_path: str | None = None) -> None:
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.create_tables()
+
+        if legacy_json_path is not None and self.count() == 0 and path.exists(legacy_json_path):
+            self.import_json(legacy_json_path)
+
+    def create_tables(self) -> None:
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS scores (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                game_version TEXT NOT NULL,
+                version_major INTEGER NOT NULL,
+                version_minor INTEGER NOT NULL,
+                flight_time REAL NOT NULL,
+                fuel_remaining REAL NOT NULL,
+                heat REAL NOT NULL,
+                crashed INTEGER NOT NULL,
+                difficulty_preset INTEGER,
+                difficulty_settings TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                timestamp REAL NOT NULL,
+                achievements TEXT NOT NULL,
+                replay BLOB,
+                on_pad INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS scores_by_version
+                ON scores (version_major, version_minor, score DESC);
+            CREATE TABLE IF NOT EXISTS journal (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                sequence INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO journal (id, sequence) VALUES (1, 0);
+        ''')
+
+        # databases from before replays were recorded, or the terrain existed
+        columns = [x[1] for x in self.connection.execute('PRAGMA table_info(scores)')]
+        if 'replay' not in columns:
+            self.connection.execute('ALTER TABLE scores ADD COLUMN replay BLOB')
+        if 'on_pad' not in columns:
+            self.connection.execute('ALTER TABLE scores ADD COLUMN on_pad INTEGER')
+        self.connection.commit()
+
+    def entry_row(self, entry: ScoreEntry) -> tuple:
+        major, minor = major_minor(entry.game_version)
+        settings = entry.difficulty_settings
+        if isinstance(settings, DifficultySettings):
+            settings = settings.__dict__
+        return (
+            str(entry.name), entry.game_version, major, minor,
+            entry.flight_time, entry.fuel_remaining, entry.heat,
+            int(entry.crashed), settings.get('difficulty_preset'),
+            json.dumps(settings), entry.score, entry.timestamp,
+            json.dumps(entry.achievements), entry.replay, int(entry.on_pad))
+
+    def row_entry(self, row: tuple) -> ScoreEntry:
+        values = dict(zip(SCORE_COLUMNS, row))
+        values['crashed'] = bool(values['crashed'])
+        values['on_pad'] = bool(values['on_pad'])
+        values['difficulty_settings'] = json.loads(values['difficulty_settings'])
+        values['achievements'] = json.loads(values['achievements'])
+        return ScoreEntry(**values)
+
+    def journal_sequence(self) -> int:
+        # last ScoreWriter journal entry that made it into the database
+        return self.connection.execute(
+            'SELECT sequence FROM journal WHERE id = 1').fetchone()[0]
+
+    def append_many(
+            self, entries: list[ScoreEntry],
+            journal_sequence: int | None = None) -> None:
+        self.connection.executemany('''
+            INSERT INTO scores (
+                name, game_version, version_major, version_minor,
+                flight_time, fuel_remaining, heat, crashed,
+                difficulty_preset, difficulty_settings, score, timestamp,
+                achievements, replay, on_pad)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [self.entry_row(x) for x in entries])
+        if journal_sequence is not None:
+            self.connection.execute(
+                'UPDATE journal SET sequence = ? WHERE id = 1', (journal_sequence,))
+        self.connection.commit()
+
+    def append(self, entry: ScoreEntry) -> None:
+        self.append_many([entry])
+
+    def count(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+
+    def top(self, version: str, limit: int = 10) -> list[ScoreEntry]:
+        # highest scores for the major.minor version, straight off the index
+        columns = ', '.join(SCORE_COLUMNS)
+        rows = self.connection.execute(f'''
+            SELECT {columns} FROM scores
+            WHERE version_major = ? AND version_minor = ?
+            ORDER BY score DESC LIMIT ?
+        ''', (*major_minor(version), limit))
+        return [self.row_entry(x) for x in rows]
+
+    def iter_entries(self, batch_size: int = 1000) -> Iterator[ScoreEntry]:
+        columns = ', '.join(SCORE_COLUMNS)
+        cursor = self.connection.execute(f'SELECT {columns} FROM scores ORDER BY id')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if len(rows) == 0:
+                return
+            for row in rows:
+                yield self.row_entry(row)
+
+    def rescored_top(
+            self, limit: int = 10, formula: ScoreFormula = CURRENT_FORMULA,
+            batch_size: int = 100_000) -> list[ScoreEntry]:
+        # the best runs of every version scored under `formula`, so runs
+        # from before a formula change rank against today's. the stored
+        # scores are left alone, replays are verified against them.
+        best = np.zeros((0, 3), dtype=np.int64)
+        last_id = 0
+        while True:
+            rows = self.connection.execute('''
+                SELECT id, flight_time, fuel_remaining, heat, crashed,
+                       COALESCE(json_extract(difficulty_settings, '$.score_multiplier'), 1.0),
+                       COALESCE(on_pad, 0)
+                FROM scores WHERE id > ? ORDER BY id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if len(rows) == 0:
+                break
+
+            block = np.array(rows, dtype=np.float64)
+            scores, masks = score_runs({
+                'flight_time': block[:, 1],
+                'fuel_remaining': block[:, 2],
+                'heat': block[:, 3],
+                'crashed': block[:, 4] != 0,
+                'score_multiplier': block[:, 5],
+                'on_pad': block[:, 6] != 0,
+            }, formula)
+
+            # (id, score, mask) of the best `limit` so far, oldest first on ties
+            ids = np.array([x[0] for x in rows], dtype=np.int64)
+            best = np.concatenate((best, np.stack((ids, scores, masks.astype(np.int64)), axis=1)))
+            best = best[best[:, 1] > 0]
+            best = best[np.lexsort((best[:, 0], -best[:, 1]))[:limit]]
+            last_id = int(ids[-1])
+
+        columns = ', '.join(SCORE_COLUMNS)
+        entries = []
+        for row_id, score, mask in best.tolist():
+            entry = self.row_entry(self.connection.execute(
+                f'SELECT {columns} FROM scores WHERE id = ?', (row_id,)).fetchone())
+            entry.score = score
+            entry.achievements = achievement_names(mask, formula)
+            entries.append(entry)
+        return entries
+
+    def import_json(self, json_path: str) -> None:
+        with open(json_path, 'r') as f:
+            self.append_many([ScoreEntry(**x) for x in json.load(f)])
+
+    def export_entries(self) -> list[dict]:
+        # the shareable high_scores.json format, best scores first
+        columns = ', '.join(SCORE_COLUMNS)
+        rows = self.connection.execute(
+            f'SELECT {columns} FROM scores ORDER BY score DESC, id')
+        return [self.row_entry(x).as_dict() for x in rows]
+
+    def export_json(self, json_path: str) -> None:
+        atomic_write_json(json_path, self.export_entries())
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,153 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from functions.data_structures import *
+from functions.utilities import *
+from functions.score_store import ScoreStore
+
+
+class ScoreWriter(threading.Thread):
+    # background persistence for submitted scores. each entry is appended to
+    # an fsynced journal as soon as it arrives, and every compact_interval
+    # seconds the journal is folded into the database and the JSON export
+    # is rewritten atomically. the game thread only ever puts on a queue.
+    def __init__(
+            self, db_path: str, json_path: str,
+            journal_path: str | None = None,
+            compact_interval: float = 30.0) -> None:
+        super().__init__(name='ScoreWriter', daemon=True)
+        self.db_path = db_path
+        self.json_path = json_path
+        self.journal_path = journal_path if journal_path is not None else f'{db_path}.journal'
+        self.compact_interval = compact_interval
+
+        self.queue: queue.Queue[ScoreEntry | None] = queue.Queue()
+        self.pending: list[tuple[int, ScoreEntry]] = []
+        self.sequence: int = 0
+        self.export_dirty: bool = False
+
+        self.written: int = 0
+        self.compactions: int = 0
+        # last save that failed, cleared by the next one that works
+        self.error: Exception | None = None
+
+    def read_journal(self) -> list[tuple[int, ScoreEntry]]:
+        if not os.path.exists(self.journal_path):
+            return []
+
+        entries = []
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn last line from a crash mid-write
+                entries.append((record['seq'], ScoreEntry(**record['entry'])))
+        return entries
+
+    def recover(self, store: ScoreStore) -> int:
+        # fold anything a crash left in the journal into the database.
+        # journal sequence numbers already committed are skipped.
+        committed = store.journal_sequence()
+        entries = self.read_journal()
+        self.sequence = max([committed] + [x[0] for x in entries])
+
+        missing = [x for x in entries if x[0] > committed]
+        if len(missing) > 0:
+            store.append_many([x[1] for x in missing], journal_sequence=self.sequence)
+            self.export_dirty = True
+
+        self.truncate_journal()
+        return len(missing)
+
+    def submit(self, entry: ScoreEntry) -> None:
+        # nothing would ever save the score once the thread is gone
+        if self.error is not None and not self.is_alive():
+            raise self.error
+        self.queue.put(entry)
+
+    def close(self, timeout: float | None = None) -> None:
+        self.queue.put(None)
+        self.join(timeout)
+        # scores the final compaction couldn't save are lost, say so
+        if self.error is not None:
+            raise self.error
+
+    def journal(self, entry: ScoreEntry) -> None:
+        self.sequence += 1
+        # kept in memory either way, the next compaction saves it
+        self.pending.append((self.sequence, entry))
+        try:
+            with open(self.journal_path, 'a') as f:
+                f.write(json.dumps({'seq': self.sequence, 'entry': entry.as_dict()}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as error:
+            print(f'WARNING: unable to journal score: {error}')
+            return
+        self.written += 1
+
+    def truncate_journal(self) -> None:
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def compact(self, store: ScoreStore) -> None:
+        if len(self.pending) > 0:
+            # the inserts and the journal position commit together
+            store.append_many(
+                [x[1] for x in self.pending], journal_sequence=self.pending[-1][0])
+            self.pending = []
+            self.truncate_journal()
+            self.export_dirty = True
+
+        if self.export_dirty:
+            atomic_write_json(self.json_path, store.export_entries())
+            self.export_dirty = False
+
+        self.compactions += 1
+
+    def try_compact(self, store: ScoreStore) -> None:
+        # a read-only directory, a full disk or a locked database mustn't
+        # end the thread: the scores stay pending and the next compaction
+        # tries again
+        try:
+            self.compact(store)
+            self.error = None
+        except (OSError, sqlite3.Error) as error:
+            store.connection.rollback()
+            print(f'WARNING: unable to save scores, will retry: {error}')
+            self.error = error
+
+    def run(self) -> None:
+        try:
+            self.write_loop()
+        except Exception as error:
+            # submit() and close() raise it on the game thread
+            self.error = error
+            raise
+
+    def write_loop(self) -> None:
+        # sqlite connections belong to the thread that opened them
+        store = ScoreStore(self.db_path)
+        last_compaction = time.monotonic()
+
+        while True:
+            timeout = max(0.0, self.compact_interval - (time.monotonic() - last_compaction))
+            try:
+                entry = self.queue.get(timeout=timeout)
+                if entry is None:
+                    break  # close() was called
+                self.journal(entry)
+            except queue.Empty:
+                pass
+
+            if time.monotonic() - last_compaction >= self.compact_interval:
+                self.try_compact(store)
+                last_compaction = time.monotonic()
+
+        self.try_compact(store)
+        store.close()
@@ -0,0 +1,32 @@
+import pygame
+from typing import Callable
+
+
+class ScreenCache:
+    # one pre-rendered, transparent surface per screen. a screen is only
+    # redrawn when the key describing its inputs changes.
+    def __init__(self, dimensions: tuple[int, int]) -> None:
+        self.dimensions = dimensions
+        self.screens: dict[str, tuple[tuple, pygame.Surface, pygame.Rect]] = {}
+        self.renders: int = 0
+
+    def get(
+            self, name: str, key: tuple,
+            draw: Callable[[pygame.Surface], None]) -> tuple[pygame.Surface, pygame.Rect]:
+        # returns the surface and the area of it that was actually drawn on
+        cached = self.screens.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+
+        surface = pygame.Surface(self.dimensions, pygame.SRCALPHA)
+        draw(surface)
+        bounds = surface.get_bounding_rect()
+        self.screens[name] = (key, surface, bounds)
+        self.renders += 1
+        return surface, bounds
+
+    def invalidate(self, name: str | None = None) -> None:
+        if name is None:
+            self.screens.clear()
+        else:
+            self.screens.pop(name, None)
@@ -0,0 +1,69 @@
+import pygame
+from collections import OrderedDict
+
+
+class RotationCache:
+    # pre-rotated copies of each sprite, keyed by sprite name and angle
+    # bucket. least recently used surfaces are dropped past max_entries.
+    def __init__(
+            self, sprites: dict[str, pygame.Surface],
+            angle_step: float = 1.0,
+            max_entries: int | None = None) -> None:
+        self.sprites = sprites
+        self.angle_step = angle_step
+        self.buckets = int(round(360 / angle_step))
+
+        # default is enough room for every sprite at every angle
+        self.max_entries = (
+            max_entries if max_entries is not None else self.buckets * len(sprites))
+
+        self.surfaces: OrderedDict[tuple[str, int], pygame.Surface] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def bucket(self, angle: float) -> int:
+        return int(round((angle % 360) / self.angle_step)) % self.buckets
+
+    def rotate(self, name: str, bucket: int) -> pygame.Surface:
+        surface = pygame.transform.rotate(self.sprites[name], bucket * self.angle_step)
+        self.surfaces[(name, bucket)] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def get(self, name: str, angle: float) -> pygame.Surface:
+        key = (name, self.bucket(angle))
+        surface = self.surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+            return self.rotate(*key)
+
+        self.hits += 1
+        self.surfaces.move_to_end(key)
+        return surface
+
+    def warm(self, names: list[str] | None = None) -> None:
+        # rotate everything up front so the game loop only does lookups
+        for name in names if names is not None else self.sprites:
+            for bucket in range(self.buckets):
+                if len(self.surfaces) >= self.max_entries:
+                    return
+                if (name, bucket) not in self.surfaces:
+                    self.rotate(name, bucket)
+
+    def memory_bytes(self) -> int:
+        return sum(
+            x.get_bytesize() * x.get_width() * x.get_height()
+            for x in self.surfaces.values())
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self.surfaces),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'memory_bytes': self.memory_bytes(),
+        }
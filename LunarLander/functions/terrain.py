@@ -0,0 +1,215 @@
+import math
+from random import Random
+
+import numpy as np
+
+from functions.data_structures import DifficultySettings
+
+
+# the flat strip every terrain is built up from, as tall as the old ground
+GROUND_HEIGHT: int = 25
+
+# steepest ground a lander can set down on off a pad: the rise across its
+# feet may be at most this fraction of their width (tan 12 degrees)
+MAX_LANDING_SLOPE: float = math.tan(math.radians(12))
+
+
+def extreme_tables(values: np.ndarray, levels: int) -> tuple[np.ndarray, np.ndarray]:
+    # sparse tables: row k holds the min (and max) of the 2**k values
+    # starting at every column, so any run's min/max is two lookups
+    minimum = np.empty((levels, len(values)), dtype=values.dtype)
+    maximum = np.empty((levels, len(values)), dtype=values.dtype)
+    minimum[0] = maximum[0] = values
+    for level in range(1, levels):
+        half = 1 << (level - 1)
+        minimum[level] = minimum[level - 1]
+        maximum[level] = maximum[level - 1]
+        minimum[level, :-half] = np.minimum(minimum[level - 1, :-half], minimum[level - 1, half:])
+        maximum[level, :-half] = np.maximum(maximum[level - 1, :-half], maximum[level - 1, half:])
+    return minimum, maximum
+
+
+def nearest_offsets(
+        centers: np.ndarray, x_pos: np.ndarray | float,
+        width: int | None = None) -> np.ndarray | float:
+    # signed distance from x_pos to the closest of `centers` (last axis)
+    # going either way around a world `width` wide, or straight across
+    offsets = centers - np.asarray(x_pos)[..., None]
+    if width is not None:
+        offsets = (offsets + width / 2) % width - width / 2
+    nearest = offsets[..., 0]
+    for column in range(1, offsets.shape[-1]):
+        candidate = offsets[..., column]
+        nearest = np.where(np.abs(candidate) < np.abs(nearest), candidate, nearest)
+    return nearest
+
+
+class Terrain:
+    # one heightmap column per pixel across the window, holding the screen y
+    # of the surface. the lander wraps around the edges and so does the
+    # terrain: column lookups are taken modulo the width, and the min/max
+    # tables run past the right edge so wrapped runs stay contiguous.
+    def __init__(
+            self, heights: np.ndarray, pads: list[tuple[int, int]],
+            max_span: int = 256) -> None:
+        self.heights = np.asarray(heights, dtype=np.int16)
+        self.width = len(self.heights)
+        self.pads = pads
+        self.max_span = min(max_span, self.width)
+
+        # landing pad under every column, -1 for none
+        self.pad_index = np.full(self.width, -1, dtype=np.int8)
+        for index, (start, end) in enumerate(pads):
+            self.pad_index[start:end] = index
+        self.pad_centers = np.array([(start + end) / 2 for start, end in pads], dtype=np.float64)
+
+        self.levels = self.max_span.bit_length()
+        wrapped = np.concatenate([self.heights, self.heights[:self.max_span]])
+        self.minimum, self.maximum = extreme_tables(wrapped, self.levels)
+
+        # the scalar physics step reads plain lists, numpy indexing one
+        # element at a time is slower than the lookup itself. only built
+        # for terrains flown one lander at a time.
+        self.lists: tuple[list, list, list, list] | None = None
+
+    def scalar_tables(self) -> tuple[list, list, list, list]:
+        # heights, pad index, minimum and maximum tables as lists
+        if self.lists is None:
+            self.lists = (
+                self.heights.tolist(), self.pad_index.tolist(),
+                self.minimum.tolist(), self.maximum.tolist())
+        return self.lists
+
+    def span(self, x_start: float, x_end: float) -> tuple[int, int, int]:
+        # wrapped first column, last column and table level of the columns
+        # under x_start..x_end
+        start = math.floor(x_start)
+        length = min(math.floor(x_end) - start + 1, self.max_span)
+        start %= self.width
+        level = length.bit_length() - 1
+        return start, start + length - (1 << level), level
+
+    def height_at(self, x_pos: float) -> int:
+        return self.scalar_tables()[0][math.floor(x_pos) % self.width]
+
+    def highest(self, x_start: float, x_end: float) -> int:
+        # the surface's highest point (smallest y) under x_start..x_end
+        first, last, level = self.span(x_start, x_end)
+        table = self.scalar_tables()[2][level]
+        return min(table[first], table[last])
+
+    def lowest(self, x_start: float, x_end: float) -> int:
+        first, last, level = self.span(x_start, x_end)
+        table = self.scalar_tables()[3][level]
+        return max(table[first], table[last])
+
+    def pad_under(self, x_start: float, x_end: float) -> int:
+        # the pad both ends stand on, -1 unless they're on the same one.
+        # pads are one run of columns, so that covers everything between.
+        pads = self.scalar_tables()[1]
+        pad = pads[math.floor(x_start) % self.width]
+        if pad != pads[math.floor(x_end) % self.width]:
+            return -1
+        return pad
+
+
+class TerrainBatch:
+    # the Terrain lookups for a BatchSimulator, one terrain per lander,
+    # stacked so every lander is answered at once
+    def __init__(self, terrains: list[Terrain]) -> None:
+        self.terrains = list(terrains)
+        self.width = terrains[0].width
+        self.max_span = terrains[0].max_span
+        self.rows = np.arange(len(terrains))
+        if any(x.width != self.width or x.max_span != self.max_span for x in terrains):
+            raise ValueError('ERROR: every terrain in a batch needs the same width and span')
+
+        self.heights = np.stack([x.heights for x in terrains])
+        self.pad_index = np.stack([x.pad_index for x in terrains])
+        self.minimum = np.stack([x.minimum for x in terrains], axis=1)
+        self.maximum = np.stack([x.maximum for x in terrains], axis=1)
+        # terrains with fewer pads repeat their first one to fill the row
+        pads = max(len(x.pads) for x in terrains)
+        self.pad_centers = np.stack([self.pad_row(x, pads) for x in terrains])
+
+    def pad_row(self, terrain: Terrain, pads: int) -> np.ndarray:
+        return np.resize(terrain.pad_centers, pads)
+
+    def set(self, index: int, terrain: Terrain) -> None:
+        if terrain.width != self.width or terrain.max_span != self.max_span:
+            raise ValueError('ERROR: every terrain in a batch needs the same width and span')
+        if len(terrain.pads) > self.pad_centers.shape[1]:
+            self.pad_centers = np.concatenate([
+                self.pad_centers,
+                self.pad_centers[:, :len(terrain.pads) - self.pad_centers.shape[1]]], axis=1)
+
+        self.terrains[index] = terrain
+        self.heights[index] = terrain.heights
+        self.pad_index[index] = terrain.pad_index
+        self.minimum[:, index] = terrain.minimum
+        self.maximum[:, index] = terrain.maximum
+        self.pad_centers[index] = self.pad_row(terrain, self.pad_centers.shape[1])
+
+    def span(self, x_start: np.ndarray, x_end: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        start = np.floor(x_start).astype(np.int64)
+        length = np.minimum(np.floor(x_end).astype(np.int64) - start + 1, self.max_span)
+        start %= self.width
+        level = np.frexp(length)[1] - 1
+        return start, start + length - (1 << level), level
+
+    def highest(self, x_start: np.ndarray, x_end: np.ndarray) -> np.ndarray:
+        first, last, level = self.span(x_start, x_end)
+        return np.minimum(
+            self.minimum[level, self.rows, first], self.minimum[level, self.rows, last])
+
+    def lowest(self, x_start: np.ndarray, x_end: np.ndarray) -> np.ndarray:
+        first, last, level = self.span(x_start, x_end)
+        return np.maximum(
+            self.maximum[level, self.rows, first], self.maximum[level, self.rows, last])
+
+    def pad_under(self, x_start: np.ndarray, x_end: np.ndarray) -> np.ndarray:
+        left = self.pad_index[self.rows, np.floor(x_start).astype(np.int64) % self.width]
+        right = self.pad_index[self.rows, np.floor(x_end).astype(np.int64) % self.width]
+        return np.where(left == right, left, -1)
+
+
+def generate_terrain(
+        seed: int, window_dimensions: tuple[int, int],
+        roughness: float = 40.0, pad_count: int = 3, pad_width: int = 100,
+        harmonics: int = 8) -> Terrain:
+    # whole sine waves across the width, so the left and right edges meet
+    # when the lander wraps around. each harmonic is quieter than the last,
+    # then the pads are flattened in, one per equal slice of the window.
+    rng = Random(seed)
+    width, height = window_dimensions
+    phase = np.arange(width) / width * 2 * np.pi
+
+    elevation = np.zeros(width)
+    for harmonic in range(1, harmonics + 1):
+        amplitude = rng.uniform(0.5, 1.0) / harmonic
+        elevation += amplitude * np.sin(harmonic * phase + rng.uniform(0, 2 * np.pi))
+    elevation = (elevation - elevation.min()) / (elevation.max() - elevation.min()) * roughness
+
+    pads = []
+    pad_width = min(pad_width, width // max(pad_count, 1))
+    for index in range(pad_count):
+        sector = width / pad_count
+        start = int(index * sector + rng.uniform(0, sector - pad_width))
+        end = start + pad_width
+        elevation[start:end] = elevation[start:end].mean()
+        pads.append((start, end))
+
+    heights = np.round(height - GROUND_HEIGHT - elevation).astype(np.int16)
+    return Terrain(heights, pads)
+
+
+def difficulty_terrain(
+        difficulty: DifficultySettings,
+        window_dimensions: tuple[int, int]) -> Terrain:
+    # the terrain a flight at this difficulty is flown over, rebuilt from
+    # the difficulty's seed by the replay player
+    return generate_terrain(
+        difficulty.seed, window_dimensions,
+        roughness=difficulty.terrain_roughness,
+        pad_count=difficulty.landing_pads,
+        pad_width=difficulty.pad_width)
@@ -0,0 +1,87 @@
+import pygame
+from collections import OrderedDict
+
+
+class TextRenderer:
+    # caches font rasterization. whole strings go in an LRU, and readouts
+    # that change every frame are built from a per-colour glyph atlas so only
+    # a handful of tiny blits happen instead of a font.render call.
+    def __init__(
+            self, font: pygame.font.Font,
+            max_strings: int = 256,
+            antialias: bool = True) -> None:
+        self.font = font
+        self.antialias = antialias
+        self.max_strings = max_strings
+
+        self.strings: OrderedDict[tuple[str, tuple], pygame.Surface] = OrderedDict()
+        self.glyphs: dict[tuple[str, tuple], pygame.Surface] = {}
+        self.advances: dict[str, int] = {}
+        self.line_height: int = font.get_linesize()
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def render(self, text: str, color: tuple[int, int, int]) -> pygame.Surface:
+        key = (text, color)
+        surface = self.strings.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.strings.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.font.render(text, self.antialias, color)
+        self.strings[key] = surface
+        if len(self.strings) > self.max_strings:
+            self.strings.popitem(last=False)
+        return surface
+
+    def glyph(self, char: str, color: tuple[int, int, int]) -> pygame.Surface:
+        key = (char, color)
+        surface = self.glyphs.get(key)
+        if surface is None:
+            surface = self.font.render(char, self.antialias, color)
+            self.glyphs[key] = surface
+        return surface
+
+    def advance(self, char: str) -> int:
+        width = self.advances.get(char)
+        if width is None:
+            width = self.font.size(char)[0]
+            self.advances[char] = width
+        return width
+
+    def warm_glyphs(self, colors: list[tuple[int, int, int]], chars: str = '0123456789.-,') -> None:
+        for color in colors:
+            for char in chars:
+                self.glyph(char, color)
+                self.advance(char)
+
+    def blit_glyphs(
+            self, canvas: pygame.Surface, text: str,
+            pos: tuple[int, int], color: tuple[int, int, int]) -> pygame.Rect:
+        x_pos, y_pos = pos
+        for char in text:
+            canvas.blit(self.glyph(char, color), (x_pos, y_pos))
+            x_pos += self.advance(char)
+        return pygame.Rect(pos[0], y_pos, x_pos - pos[0], self.line_height)
+
+    def blit_readout(
+            self, canvas: pygame.Surface, label: str, value: str,
+            pos: tuple[int, int], color: tuple[int, int, int]) -> pygame.Rect:
+        # static label from the string cache, changing value from glyphs
+        label_render = self.render(label, color)
+        canvas.blit(label_render, pos)
+        value_rect = self.blit_glyphs(
+            canvas, value, (pos[0] + label_render.get_width(), pos[1]), color)
+        return label_render.get_rect(topleft=pos).union(value_rect)
+
+    def stats(self) -> dict:
+        return {
+            'strings': len(self.strings),
+            'max_strings': self.max_strings,
+            'glyphs': len(self.glyphs),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
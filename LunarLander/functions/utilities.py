@@ -1,6 +1,20 @@
+import json
+import os
+
 from functions.data_structures import *
 
 
+def atomic_write_json(json_path: str, data) -> None:
+    # write next to the target and rename over it, readers and crashes only
+    # ever see the old file or the complete new one
+    temp_path = f'{json_path}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, json_path)
+
+
 def text_offset(text_list: list[str], window_dimensions: tuple[int, int]) -> int:
     return int((window_dimensions[1] // 2) - int(len(text_list)//2 * 30))
 
@@ -12,6 +26,12 @@ def parse_version_number(version: str) -> list[int, int, int] | None:
     return parts
 
 
+def major_minor(version: str) -> tuple[int, int]:
+    # leaderboards are split by major and minor version, not patch
+    parts = parse_version_number(version)
+    return int(parts[0]), int(parts[1])
+
+
 def sort_scores(scores: list[ScoreEntry], version: str | None = None) -> list[ScoreEntry]:
     scores = sorted(scores, key=lambda x: x.score, reverse=True)
     if version is None:
@@ -0,0 +1,148 @@
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from functions.data_structures import *
+from functions.replay import *
+from functions.batch import BatchSimulator, step_times
+
+
+# submitted fields that have to come out of the replay unchanged
+VERIFIED_FIELDS: tuple[str, ...] = (
+    'flight_time', 'fuel_remaining', 'heat', 'crashed', 'on_pad', 'score', 'achievements')
+
+
+@dataclass
+class Verification:
+    index: int
+    name: str
+    score: int
+    mismatches: list[str] = field(default_factory=list)
+    flight_seconds: float = 0.0  # simulated seconds replayed
+    seconds: float = 0.0  # wall clock seconds spent replaying
+
+    def ok(self) -> bool:
+        return len(self.mismatches) == 0
+
+    def speedup(self) -> float:
+        return self.flight_seconds / self.seconds if self.seconds > 0 else 0.0
+
+
+def difficulty_value(settings: DifficultySettings | dict, key: str):
+    # entries read back from storage carry their settings as a dict
+    if isinstance(settings, DifficultySettings):
+        return getattr(settings, key, None)
+    return settings.get(key)
+
+
+def open_replay(entry: ScoreEntry, result: Verification) -> Replay | None:
+    # decode the entry's replay and check it belongs to the submitted
+    # difficulty, None if there's nothing worth simulating
+    if entry.replay is None:
+        result.mismatches.append('no replay')
+        return None
+
+    try:
+        replay = decode_replay(entry.replay)
+        # version 3 collides with the sprites at the replay's size, they
+        # have to exist (loaded once, later replays reuse them)
+        replay.collision()
+    except (ValueError, struct.error, zlib.error) as e:
+        result.mismatches.append(f'unreadable replay: {e}')
+        return None
+
+    for key, value in (
+            ('difficulty_preset', replay.difficulty_preset), ('seed', replay.seed)):
+        submitted = difficulty_value(entry.difficulty_settings, key)
+        if submitted != value:
+            result.mismatches.append(f'{key}: submitted {submitted}, replay has {value}')
+    return replay
+
+
+def compare_entry(
+        entry: ScoreEntry, state: LanderState,
+        difficulty: DifficultySettings, result: Verification) -> None:
+    if not state.landed:
+        result.mismatches.append('replay ends before touchdown')
+
+    replayed = entry_from_state(state, difficulty, entry.name, entry.game_version)
+    for key in VERIFIED_FIELDS:
+        if getattr(entry, key) != getattr(replayed, key):
+            result.mismatches.append(
+                f'{key}: submitted {getattr(entry, key)}, replayed {getattr(replayed, key)}')
+    result.flight_seconds = state.time
+
+
+def verify_entry(entry: ScoreEntry, index: int = 0) -> Verification:
+    # re-run one replay through physics.step and compare what it produces
+    # to what was submitted. everything that doesn't match is listed.
+    start = time.perf_counter()
+    result = Verification(index=index, name=str(entry.name), score=entry.score)
+
+    replay = open_replay(entry, result)
+    if replay is not None:
+        difficulty = replay.difficulty()
+        compare_entry(entry, play_replay(replay, difficulty), difficulty, result)
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def verify_batch(items: list[tuple[int, ScoreEntry]]) -> list[Verification]:
+    # same checks as verify_entry, but every replay sharing a window, sprite
+    # size, tick rate and format version (ground and collision) runs in one
+    # BatchSimulator. per-replay seconds are the group's time split by the
+    # ticks each replay needed.
+    results = []
+    groups: dict[tuple, list[tuple[ScoreEntry, Verification, Replay]]] = {}
+    for index, entry in items:
+        result = Verification(index=index, name=str(entry.name), score=entry.score)
+        results.append(result)
+        replay = open_replay(entry, result)
+        if replay is not None:
+            key = (replay.window_dimensions, replay.size, replay.tick_rate, replay.version)
+            groups.setdefault(key, []).append((entry, result, replay))
+
+    for (window_dimensions, size, tick_rate, _), group in groups.items():
+        start = time.perf_counter()
+        dt = 1 / tick_rate
+        difficulties = [x[2].difficulty() for x in group]
+        lengths = np.array([len(x[2].inputs) for x in group])
+
+        batch = BatchSimulator.from_states([
+            launch_state(
+                difficulty, window_dimensions, size,
+                replay.terrain(difficulty), replay.collision())
+            for difficulty, (_, _, replay) in zip(difficulties, group)])
+        inputs = np.zeros((lengths.max(initial=0), len(group)), dtype=np.uint8)
+        for column, (_, _, replay) in enumerate(group):
+            inputs[:len(replay.inputs), column] = replay.inputs
+
+        # play_replay stops at touchdown, so keep the tick each lander landed
+        # on and the flight time it had then
+        landed_at = np.full(len(group), -1)
+        flight_times = step_times(len(inputs), dt)
+        for tick in range(len(inputs)):
+            batch.step(inputs[tick], dt)
+            landed_at[batch.landed & (landed_at < 0)] = tick + 1
+            if batch.landed.all():
+                break
+
+        simulated = np.where(landed_at > 0, landed_at, lengths)
+        elapsed = time.perf_counter() - start
+        for column, (entry, result, replay) in enumerate(group):
+            if landed_at[column] < 0 or landed_at[column] > lengths[column]:
+                # ran out of inputs in the air, only the scalar player stops
+                # stepping at the end of the replay
+                state = play_replay(replay, difficulties[column])
+            else:
+                state = batch.state(column)
+                state.time = float(flight_times[landed_at[column]])
+
+            compare_entry(entry, state, difficulties[column], result)
+            result.seconds = elapsed * simulated[column] / simulated.sum()
+
+    return results
@@ -0,0 +1,138 @@
+from os import path, cpu_count
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Iterator
+import argparse
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+
+from functions.data_structures import *
+from functions.score_store import ScoreStore
+from functions.verification import Verification, verify_batch
+
+
+def read_entries(db_path: str | None, json_path: str | None) -> Iterator[ScoreEntry]:
+    if json_path is not None:
+        # a batch of submissions in the high_scores.json format
+        with open(json_path, 'r') as f:
+            for score in json.load(f):
+                yield ScoreEntry(**score)
+        return
+
+    store = ScoreStore(db_path)
+    yield from store.iter_entries()
+    store.close()
+
+
+def chunked(entries: Iterator[ScoreEntry], size: int) -> Iterator[list[tuple[int, ScoreEntry]]]:
+    chunk = []
+    for item in enumerate(entries):
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def bounded_map(
+        pool: Executor, function: Callable, items: Iterator,
+        window: int) -> Iterator:
+    # pool.map submits every item up front, this keeps at most `window` in
+    # flight so the input is only read as fast as the workers get through it
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while len(pending) > 0:
+        yield pending.popleft().result()
+
+
+def write_timings(timings_path: str, results: list[Verification]) -> None:
+    with open(timings_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['index', 'name', 'score', 'ok', 'flight_seconds', 'milliseconds', 'mismatches'])
+        for result in results:
+            writer.writerow([
+                result.index, result.name, result.score, result.ok(),
+                round(result.flight_seconds, 2), round(result.seconds * 1000, 3),
+                '; '.join(result.mismatches)])
+
+
+def missing_replay(result: Verification) -> bool:
+    return result.mismatches == ['no replay']
+
+
+def report(results: list[Verification], elapsed: float, workers: int) -> None:
+    replayed = [x for x in results if x.seconds > 0]
+    failed = [x for x in results if not x.ok() and not missing_replay(x)]
+    missing = [x for x in results if missing_replay(x)]
+
+    print(
+        f'verified {len(results) - len(failed) - len(missing)}/{len(results)} scores '
+        f'in {elapsed:.2f}s ({len(results) / elapsed:,.0f} scores/s across {workers} workers)')
+    if len(missing) > 0:
+        print(f'{len(missing)} scores were submitted before replays were recorded')
+
+    if len(replayed) > 0:
+        milliseconds = np.array([x.seconds * 1000 for x in replayed])
+        flight_seconds = sum(x.flight_seconds for x in replayed)
+        print(
+            f'per replay: p50 {np.percentile(milliseconds, 50):.3f}ms, '
+            f'p99 {np.percentile(milliseconds, 99):.3f}ms, '
+            f'max {milliseconds.max():.3f}ms, '
+            f'{flight_seconds / (milliseconds.sum() / 1000):,.0f}x realtime')
+
+    for result in failed:
+        print(f'FAILED #{result.index} {result.name} ({result.score}): {", ".join(result.mismatches)}')
+
+
+if __name__ == '__main__':
+    abs_path = path.dirname(path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description='Re-simulate score replays and check them')
+    parser.add_argument(
+        '--db', default=path.join(abs_path, 'high_scores.db'),
+        help='score database to verify')
+    parser.add_argument('--json', help='verify a high_scores.json style file instead')
+    parser.add_argument('--workers', type=int, default=cpu_count())
+    parser.add_argument(
+        '--chunksize', type=int, default=1000,
+        help='replays handed to a worker and simulated as one batch')
+    parser.add_argument('--timings', help='write per-replay results and timing to this CSV')
+    parser.add_argument('--verbose', action='store_true', help='print every replay')
+    args = parser.parse_args()
+
+    # ScoreStore would quietly create an empty database
+    source = args.json if args.json is not None else args.db
+    if not path.exists(source):
+        raise SystemExit(f'ERROR: {source} does not exist')
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = []
+        chunks = chunked(read_entries(args.db, args.json), args.chunksize)
+        # two chunks per worker, one running and one queued behind it
+        for chunk in bounded_map(pool, verify_batch, chunks, 2 * args.workers):
+            for result in chunk:
+                if args.verbose:
+                    status = 'ok' if result.ok() else 'FAILED'
+                    print(
+                        f'#{result.index} {result.name} {result.score}: {status} '
+                        f'{result.seconds * 1000:.3f}ms ({result.speedup():,.0f}x realtime)')
+                results.append(result)
+    elapsed = time.perf_counter() - start
+
+    if len(results) == 0:
+        raise SystemExit('no scores to verify')
+
+    report(results, elapsed, args.workers)
+    if args.timings:
+        write_timings(args.timings, results)
+
+    sys.exit(0 if all(x.ok() or missing_replay(x) for x in results) else 1)
@@ -1,68 +1,308 @@
+import argparse
 import json
-from matplotlib import pyplot as plt
+import sqlite3
+import sys
+from os import path, makedirs
+
 import numpy as np
 
-with open('./LunarLander/high_scores.json', 'r') as json_file:
-    scores = json.load(json_file)
-
-flight_time = []
-fuel_level = []
-overall_score = []
-
-for score in scores:
-    flight_time.append(score['flight_time'])
-    fuel_level.append(score['fuel_remaining'])
-    overall_score.append(score['score'])
-
-# Scatter plot with color encoding
-plt.figure(figsize=(10, 6))
-plt.scatter(flight_time, overall_score, s=fuel_level,
-            c=fuel_level, cmap='coolwarm', alpha=0.7)
-plt.colorbar(label='Fuel Level')
-plt.xlabel('Flight Time')
-plt.ylabel('Overall Score')
-plt.title('Flight Time vs Overall Score with Fuel Level')
-plt.grid(True)
-plt.show()
-
-# Bubble chart
-plt.figure(figsize=(10, 6))
-plt.scatter(flight_time, overall_score, s=fuel_level*5, alpha=0.5)
-plt.xlabel('Flight Time')
-plt.ylabel('Overall Score')
-plt.title('Bubble Chart: Flight Time vs Overall Score with Fuel Level')
-plt.grid(True)
-plt.show()
-
-# 3D Scatter Plot
-
-fig = plt.figure(figsize=(10, 8))
-ax = fig.add_subplot(111, projection='3d')
-ax.scatter(flight_time, overall_score, fuel_level,
-           c=fuel_level, cmap='coolwarm')
-ax.set_xlabel('Flight Time')
-ax.set_ylabel('Overall Score')
-ax.set_zlabel('Fuel Level')
-ax.set_title('3D Scatter Plot: Flight Time vs Overall Score vs Fuel Level')
-plt.show()
-
-# Line Plot with Dual Y-axis (assuming time as x-axis)
-time = np.arange(1, 51)
-
-fig, ax1 = plt.subplots(figsize=(10, 6))
-
-ax1.plot(time, flight_time, 'b-', label='Flight Time')
-ax1.set_xlabel('Time')
-ax1.set_ylabel('Flight Time', color='b')
-ax1.tick_params('y', colors='b')
-
-ax2 = ax1.twinx()
-ax2.plot(time, fuel_level, 'r-', label='Fuel Level')
-ax2.plot(time, overall_score, 'g-', label='Overall Score')
-ax2.set_ylabel('Fuel Level & Overall Score', color='r')
-ax2.tick_params('y', colors='r')
-
-fig.tight_layout()
-plt.title(
-    'Line Plot with Dual Y-axis: Flight Time, Fuel Level, and Overall Score over Time')
-plt.show()
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), 'LunarLander'))
+from functions.rescoring import *  # noqa: E402
+
+DEFAULT_DB = './LunarLander/high_scores.db'
+DEFAULT_JSON = './LunarLander/high_scores.json'
+
+# numeric columns pulled out of the score store, in query order
+COLUMNS: tuple[str, ...] = (
+    'version_major', 'version_minor', 'difficulty_preset',
+    'flight_time', 'fuel_remaining', 'heat', 'crashed', 'score', 'timestamp',
+    'score_multiplier', 'on_pad')
+DTYPES: dict[str, type] = {
+    'version_major': np.int32,
+    'version_minor': np.int32,
+    'difficulty_preset': np.int32,
+    'flight_time': np.float64,
+    'fuel_remaining': np.float64,
+    'heat': np.float64,
+    'crashed': np.bool_,
+    'score': np.int64,
+    'timestamp': np.float64,
+    'score_multiplier': np.float64,
+    'on_pad': np.bool_,
+}
+# columns that aren't stored as-is
+EXPRESSIONS: dict[str, str] = {
+    'difficulty_preset': 'COALESCE(difficulty_preset, 0)',
+    'score_multiplier': "COALESCE(json_extract(difficulty_settings, '$.score_multiplier'), 1.0)",
+    'on_pad': 'COALESCE(on_pad, 0)',
+}
+
+
+def load_columns_db(db_path: str, chunk_size: int = 100_000) -> dict[str, np.ndarray]:
+    # stream rows straight into preallocated arrays, never holding a python
+    # object per score
+    connection = sqlite3.connect(db_path)
+    total = connection.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+    columns = {name: np.empty(total, dtype=DTYPES[name]) for name in COLUMNS}
+
+    # databases the game hasn't opened since the terrain was added
+    stored = [x[1] for x in connection.execute('PRAGMA table_info(scores)')]
+    expressions = ', '.join(
+        EXPRESSIONS.get(x, x) if x != 'on_pad' or x in stored else '0' for x in COLUMNS)
+    cursor = connection.execute(f'SELECT {expressions} FROM scores ORDER BY timestamp')
+    offset = 0
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if len(rows) == 0:
+            break
+        block = np.array(rows, dtype=np.float64)
+        for index, name in enumerate(COLUMNS):
+            columns[name][offset:offset + len(rows)] = block[:, index]
+        offset += len(rows)
+
+    connection.close()
+    return columns
+
+
+def load_columns_json(json_path: str) -> dict[str, np.ndarray]:
+    # fallback for a bare high_scores.json export
+    with open(json_path, 'r') as f:
+        scores = sorted(json.load(f), key=lambda x: x['timestamp'])
+
+    versions = [x['game_version'].split('.') for x in scores]
+    values = {
+        'version_major': [int(x[0]) for x in versions],
+        'version_minor': [int(x[1]) for x in versions],
+        'difficulty_preset': [x['difficulty_settings'].get('difficulty_preset', 0) for x in scores],
+    }
+    for name in COLUMNS[3:-2]:
+        values[name] = [x[name] for x in scores]
+    values['score_multiplier'] = [
+        x['difficulty_settings'].get('score_multiplier', 1.0) for x in scores]
+    values['on_pad'] = [x.get('on_pad', False) for x in scores]
+    return {name: np.asarray(values[name], dtype=DTYPES[name]) for name in COLUMNS}
+
+
+def achievement_counts_db(db_path: str) -> dict[tuple[int, int, int], dict[str, int]]:
+    # counted inside SQLite, the achievement lists never reach python
+    connection = sqlite3.connect(db_path)
+    rows = connection.execute('''
+        SELECT version_major, version_minor, COALESCE(difficulty_preset, 0),
+               achievement.value, COUNT(*)
+        FROM scores, json_each(scores.achievements) AS achievement
+        GROUP BY 1, 2, 3, 4
+    ''').fetchall()
+    connection.close()
+
+    counts = {}
+    for major, minor, preset, name, count in rows:
+        counts.setdefault((major, minor, preset), {})[name] = count
+    return counts
+
+
+def achievement_counts_json(json_path: str) -> dict[tuple[int, int, int], dict[str, int]]:
+    with open(json_path, 'r') as f:
+        scores = json.load(f)
+
+    counts = {}
+    for score in scores:
+        major, minor = (int(x) for x in score['game_version'].split('.')[:2])
+        key = (major, minor, score['difficulty_settings'].get('difficulty_preset', 0))
+        group = counts.setdefault(key, {})
+        for name in score['achievements']:
+            group[name] = group.get(name, 0) + 1
+    return counts
+
+
+def achievement_counts_rescored(
+        columns: dict[str, np.ndarray],
+        masks: np.ndarray) -> dict[tuple[int, int, int], dict[str, int]]:
+    keys = np.stack([
+        columns['version_major'], columns['version_minor'],
+        columns['difficulty_preset']], axis=1)
+    groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    counts = {}
+    for index, key in enumerate(groups):
+        group = achievement_counts(masks[inverse == index])
+        counts[tuple(int(x) for x in key)] = {x: y for x, y in group.items() if y > 0}
+    return counts
+
+
+def correlation(x: np.ndarray, y: np.ndarray) -> float | None:
+    if len(x) < 2 or np.std(x) == 0 or np.std(y) == 0:
+        return None
+    return round(float(np.corrcoef(x, y)[0, 1]), 4)
+
+
+def summarize(
+        columns: dict[str, np.ndarray],
+        achievements: dict[tuple[int, int, int], dict[str, int]]) -> list[dict]:
+    # one summary per (major.minor version, difficulty preset)
+    keys = np.stack([
+        columns['version_major'], columns['version_minor'],
+        columns['difficulty_preset']], axis=1)
+    groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    summary = []
+    for index, (major, minor, preset) in enumerate(groups):
+        in_group = inverse == index
+        landed = in_group & ~columns['crashed']
+        scores = columns['score'][landed]
+        fuel = columns['fuel_remaining'][landed]
+        flight_time = columns['flight_time'][landed]
+
+        total = int(in_group.sum())
+        group_key = (int(major), int(minor), int(preset))
+        summary.append({
+            'version': f'{major}.{minor}',
+            'difficulty_preset': int(preset),
+            'runs': total,
+            'crash_rate': round(1 - len(scores) / total, 4),
+            'score_percentiles': {
+                f'p{x}': round(float(np.percentile(scores, x)), 2) if len(scores) > 0 else None
+                for x in (10, 50, 90, 99)},
+            'mean_flight_time': round(float(flight_time.mean()), 2) if len(scores) > 0 else None,
+            'mean_fuel_remaining': round(float(fuel.mean()), 2) if len(scores) > 0 else None,
+            'fuel_score_correlation': correlation(fuel, scores),
+            'time_score_correlation': correlation(flight_time, scores),
+            'fuel_time_correlation': correlation(fuel, flight_time),
+            'achievement_frequency': {
+                name: round(count / total, 4)
+                for name, count in sorted(achievements.get(group_key, {}).items())},
+        })
+    return summary
+
+
+def print_summary(summary: list[dict]) -> None:
+    for group in summary:
+        print(
+            f"v{group['version']} preset {group['difficulty_preset']}: "
+            f"{group['runs']:,} runs, {group['crash_rate']:.1%} crashed")
+        print(f"    score percentiles: {group['score_percentiles']}")
+        print(
+            f"    correlations: fuel/score {group['fuel_score_correlation']}, "
+            f"time/score {group['time_score_correlation']}, "
+            f"fuel/time {group['fuel_time_correlation']}")
+        for name, frequency in group['achievement_frequency'].items():
+            print(f'    {name}: {frequency:.1%}')
+
+
+def bucket_means(values: np.ndarray, buckets: int) -> np.ndarray:
+    # average consecutive runs together so long histories stay plottable
+    if len(values) <= buckets:
+        return values
+    bucket = np.arange(len(values)) * buckets // len(values)
+    return np.bincount(bucket, weights=values) / np.bincount(bucket)
+
+
+def write_plots(columns: dict[str, np.ndarray], output_dir: str, max_points: int = 50_000) -> list[str]:
+    import matplotlib
+    matplotlib.use('Agg')  # files only, no windows
+    from matplotlib import pyplot as plt
+
+    makedirs(output_dir, exist_ok=True)
+    landed = ~columns['crashed']
+    flight_time = columns['flight_time'][landed]
+    fuel_level = columns['fuel_remaining'][landed]
+    overall_score = columns['score'][landed]
+
+    # scatter plots of millions of points are unreadable and slow, sample them
+    sample = np.arange(len(overall_score))
+    if len(sample) > max_points:
+        sample = np.random.default_rng(0).choice(sample, max_points, replace=False)
+
+    written = []
+
+    # Scatter plot with color encoding
+    fig = plt.figure(figsize=(10, 6))
+    plt.scatter(flight_time[sample], overall_score[sample], s=fuel_level[sample],
+                c=fuel_level[sample], cmap='coolwarm', alpha=0.7)
+    plt.colorbar(label='Fuel Level')
+    plt.xlabel('Flight Time')
+    plt.ylabel('Overall Score')
+    plt.title('Flight Time vs Overall Score with Fuel Level')
+    plt.grid(True)
+    written.append(path.join(output_dir, 'flight_time_vs_score.png'))
+    fig.savefig(written[-1])
+    plt.close(fig)
+
+    # Score distribution
+    fig = plt.figure(figsize=(10, 6))
+    plt.hist(overall_score, bins=50)
+    plt.xlabel('Overall Score')
+    plt.ylabel('Runs')
+    plt.title('Score Distribution')
+    written.append(path.join(output_dir, 'score_histogram.png'))
+    fig.savefig(written[-1])
+    plt.close(fig)
+
+    # Line Plot with Dual Y-axis, runs in submission order
+    buckets = min(len(overall_score), 2_000)
+    run_index = (np.arange(buckets) + 1) * len(overall_score) / buckets
+    flight_time = bucket_means(flight_time, buckets)
+    fuel_level = bucket_means(fuel_level, buckets)
+    overall_score = bucket_means(overall_score, buckets)
+
+    fig, ax1 = plt.subplots(figsize=(10, 6))
+
+    ax1.plot(run_index, flight_time, 'b-', label='Flight Time')
+    ax1.set_xlabel('Run')
+    ax1.set_ylabel('Flight Time', color='b')
+    ax1.tick_params('y', colors='b')
+
+    ax2 = ax1.twinx()
+    ax2.plot(run_index, fuel_level, 'r-', label='Fuel Level')
+    ax2.plot(run_index, overall_score, 'g-', label='Overall Score')
+    ax2.set_ylabel('Fuel Level & Overall Score', color='r')
+    ax2.tick_params('y', colors='r')
+
+    fig.tight_layout()
+    plt.title('Flight Time, Fuel Level, and Overall Score over Time')
+    written.append(path.join(output_dir, 'runs_over_time.png'))
+    fig.savefig(written[-1])
+    plt.close(fig)
+
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Lunar Lander score analytics')
+    parser.add_argument('--db', default=DEFAULT_DB, help='score database to read')
+    parser.add_argument(
+        '--json', default=DEFAULT_JSON,
+        help='high_scores.json to read when the database does not exist')
+    parser.add_argument('--output', default='score_analysis', help='directory for plots')
+    parser.add_argument('--summary', help='also write the summary as JSON to this file')
+    parser.add_argument(
+        '--rescore', action='store_true',
+        help='recompute every run with the current scoring formula so versions compare')
+    parser.add_argument('--no-plots', action='store_true')
+    args = parser.parse_args()
+
+    if path.exists(args.db):
+        columns = load_columns_db(args.db)
+        achievements = achievement_counts_db(args.db)
+    else:
+        columns = load_columns_json(args.json)
+        achievements = achievement_counts_json(args.json)
+
+    if len(columns['score']) == 0:
+        raise SystemExit('no scores to analyze')
+
+    if args.rescore:
+        columns['score'], masks = score_runs(columns)
+        achievements = achievement_counts_rescored(columns, masks)
+
+    summary = summarize(columns, achievements)
+    print_summary(summary)
+
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=4)
+
+    if not args.no_plots:
+        for written in write_plots(columns, args.output):
+            print(f'wrote {written}')